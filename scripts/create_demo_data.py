@@ -4,15 +4,33 @@ Create demo data for dashboard testing.
 Only use this if you don't have real data in your silver layer.
 """
 
+import numpy as np
+import orjson
 import psycopg
+from psycopg.types.json import Jsonb
 from datetime import datetime, timezone, timedelta
-import json
-import random
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
+_COPY_DEMO_SQL = """
+    COPY silver_classes (
+        class_id, source, class_name, instructor, location,
+        start_ts, end_ts, capacity, spots_available, status, url,
+        first_seen_at, last_updated_at, last_scraped_at,
+        is_cancelled, is_past, source_run_id, source_snapshot_id, raw_data
+    ) FROM STDIN (FORMAT BINARY)
+"""
+
+# Column types for the binary COPY above, in column order
+_DEMO_TYPES = [
+    "text", "text", "text", "text", "text",
+    "timestamptz", "timestamptz", "int4", "int4", "text", "text",
+    "timestamptz", "timestamptz", "timestamptz",
+    "bool", "bool", "text", "int8", "jsonb",
+]
+
 def create_demo_data():
     """Create demo data in the silver_classes table."""
     DATABASE_URL = os.getenv("DATABASE_URL")
@@ -37,74 +55,88 @@ def create_demo_data():
     instructors = ['Sophie', 'Kim', 'Laura V.', 'Nienke D.B.', 'Gilltumn Vanhauwaert', 'Viktoria']
     
     # Generate demo classes for the last 30 days and next 30 days
-    start_date = datetime.now(timezone.utc) - timedelta(days=30)
-    end_date = datetime.now(timezone.utc) + timedelta(days=30)
+    now = datetime.now(timezone.utc)
+    start_date = now - timedelta(days=30)
+    end_date = now + timedelta(days=30)
+    
+    rng = np.random.default_rng()
+    
+    # Skip some days randomly to make data more realistic (10% chance per day)
+    all_days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    days = [day for day, skipped in zip(all_days, (rng.random(len(all_days)) < 0.1).tolist()) if not skipped]
+    
+    # Generate 5-15 classes per day, then draw every random field for all classes at once
+    classes_per_day = rng.integers(5, 16, size=len(days))
+    total_classes = int(classes_per_day.sum())
+    
+    day_index = np.repeat(np.arange(len(days)), classes_per_day)
+    source_index = rng.integers(0, len(sources), size=total_classes)
+    class_pick = rng.random(total_classes)  # Scaled to each source's class list below
+    location_pick = rng.random(total_classes)
+    instructor_index = np.where(
+        rng.random(total_classes) > 0.2, rng.integers(0, len(instructors), size=total_classes), -1
+    )
+    hours = rng.integers(7, 22, size=total_classes)  # Between 7 AM and 9 PM
+    minutes = rng.choice([0, 15, 30, 45], size=total_classes)
+    durations = rng.choice([45, 50, 60], size=total_classes)
+    capacities = rng.integers(4, 21, size=total_classes)
+    spots_booked_all = rng.integers(0, capacities + 1)  # This will go into spots_available column
     
     demo_records = []
-    class_id_counter = 1
+    columns = zip(
+        day_index.tolist(), source_index.tolist(), class_pick.tolist(), location_pick.tolist(),
+        instructor_index.tolist(), hours.tolist(), minutes.tolist(), durations.tolist(),
+        capacities.tolist(), spots_booked_all.tolist(),
+    )
     
-    current_date = start_date
-    while current_date <= end_date:
-        # Skip some days randomly to make data more realistic
-        if random.random() < 0.1:  # 10% chance to skip a day
-            current_date += timedelta(days=1)
-            continue
+    for class_id_counter, (day, source_i, class_p, location_p, instructor_i, hour, minute, duration, capacity, spots_booked) in enumerate(columns, start=1):
+        source = sources[source_i]
+        class_name = class_types[source][int(class_p * len(class_types[source]))]
+        location = locations[source][int(location_p * len(locations[source]))]
+        instructor = instructors[instructor_i] if instructor_i >= 0 else None
         
-        # Generate 5-15 classes per day
-        classes_per_day = random.randint(5, 15)
+        start_ts = days[day].replace(hour=hour, minute=minute)
+        end_ts = start_ts + timedelta(minutes=duration)
         
-        for _ in range(classes_per_day):
-            source = random.choice(sources)
-            class_name = random.choice(class_types[source])
-            location = random.choice(locations[source])
-            instructor = random.choice(instructors) if random.random() > 0.2 else None
-            
-            # Random hour between 7 AM and 9 PM
-            hour = random.randint(7, 21)
-            start_ts = current_date.replace(hour=hour, minute=random.choice([0, 15, 30, 45]))
-            end_ts = start_ts + timedelta(minutes=random.choice([45, 50, 60]))
-            
-            # Capacity and booking
-            capacity = random.randint(4, 20)
-            spots_booked = random.randint(0, capacity)  # This will go into spots_available column
-            spots_remaining = capacity - spots_booked
-            
-            # Status
-            if spots_booked == capacity:
-                status = 'Fully Booked'
-            elif spots_remaining <= 2:
-                status = 'Almost Full'
-            else:
-                status = 'Book'
-            
-            # Create class ID
-            class_id = f"{source}:{class_id_counter:012d}"
-            class_id_counter += 1
-            
-            # Raw data
-            raw_data = {
-                'date': start_ts.strftime('%d/%m/%Y'),
-                'time': f"{start_ts.strftime('%H:%M')} - {end_ts.strftime('%H:%M')}",
-                'class_name': class_name,
-                'location': location,
-                'instructor': instructor,
-                'availability': f"{spots_remaining} / {capacity}",  # remaining / total
-                'status': status
-            }
-            
-            demo_records.append((
-                class_id, source, class_name, instructor, location,
-                start_ts, end_ts, capacity, spots_booked, status, None,  # spots_booked goes to spots_available column
-                start_ts, start_ts, start_ts,
-                False, start_ts < datetime.now(timezone.utc),
-                f"demo_run_{source}", 1, json.dumps(raw_data)
-            ))
+        # Capacity and booking
+        spots_remaining = capacity - spots_booked
         
-        current_date += timedelta(days=1)
+        # Status
+        if spots_booked == capacity:
+            status = 'Fully Booked'
+        elif spots_remaining <= 2:
+            status = 'Almost Full'
+        else:
+            status = 'Book'
+        
+        # Create class ID
+        class_id = f"{source}:{class_id_counter:012d}"
+        
+        # Raw data
+        raw_data = {
+            'date': start_ts.strftime('%d/%m/%Y'),
+            'time': f"{start_ts.strftime('%H:%M')} - {end_ts.strftime('%H:%M')}",
+            'class_name': class_name,
+            'location': location,
+            'instructor': instructor,
+            'availability': f"{spots_remaining} / {capacity}",  # remaining / total
+            'status': status
+        }
+        
+        demo_records.append((
+            class_id, source, class_name, instructor, location,
+            start_ts, end_ts, capacity, spots_booked, status, None,  # spots_booked goes to spots_available column
+            start_ts, start_ts, start_ts,
+            False, start_ts < now,
+            f"demo_run_{source}", 1, Jsonb(raw_data, dumps=orjson.dumps)
+        ))
     
     # Insert demo data
     try:
-        with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        # One transaction for the DDL, the cleanup and the COPY: a single commit
+        # on exit, and a failed load rolls back instead of leaving the demo
+        # rows deleted
+        with psycopg.connect(DATABASE_URL) as conn:
             # Create silver_classes table if it doesn't exist
             with conn.cursor() as cur:
                 cur.execute("""
@@ -138,16 +170,12 @@ def create_demo_data():
                 if deleted_count > 0:
                     print(f"Deleted {deleted_count} existing demo records")
             
-            # Insert new demo data
+            # Insert new demo data in a single binary COPY stream
             with conn.cursor() as cur:
-                cur.executemany("""
-                    INSERT INTO silver_classes (
-                        class_id, source, class_name, instructor, location,
-                        start_ts, end_ts, capacity, spots_available, status, url,
-                        first_seen_at, last_updated_at, last_scraped_at,
-                        is_cancelled, is_past, source_run_id, source_snapshot_id, raw_data
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, demo_records)
+                with cur.copy(_COPY_DEMO_SQL) as copy:
+                    copy.set_types(_DEMO_TYPES)
+                    for record in demo_records:
+                        copy.write_row(record)
             
             print(f"✅ Created {len(demo_records)} demo class records")
             print(f"   Date range: {start_date.date()} to {end_date.date()}")
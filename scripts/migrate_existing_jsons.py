@@ -9,18 +9,24 @@ Usage:
 Make sure DATABASE_URL is set in your .env file.
 """
 
+import hashlib
 import os
-import json
 import uuid
 import re
 import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List
+from typing import Any, Dict, Iterable, Iterator, List
+import orjson
 import psycopg
 from psycopg.rows import dict_row
 from dotenv import load_dotenv
 
+# Make the project root importable when run as a plain script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
 # Load environment variables
 load_dotenv()
 
@@ -31,17 +37,47 @@ if not DATABASE_URL:
     print("ERROR: DATABASE_URL not set. Please set it in your .env file.", file=sys.stderr)
     sys.exit(1)
 
+_COPY_SNAPSHOTS_SQL = """
+    COPY schedule_snapshots
+    (run_id, source, item_uid, class_name, instructor, location, start_ts, end_ts,
+     capacity, spots_available, status, url, scraped_at, raw)
+    FROM STDIN WITH (FORMAT BINARY)
+"""
+
+# Column types for the binary COPY above, in column order
+_SNAPSHOT_TYPES = [
+    "text", "text", "text", "text", "text", "text", "timestamptz", "timestamptz",
+    "int4", "int4", "text", "text", "timestamptz", "jsonb",
+]
+
+_INSERT_RUNS_SQL = """
+    INSERT INTO scrape_runs (run_id, source, git_sha)
+    SELECT * FROM unnest(%s::text[], %s::text[], %s::text[])
+"""
+
+# Secondary indexes on schedule_snapshots, by name
+_SNAPSHOT_INDEXES = {
+    "ix_snapshots_source_start": "schedule_snapshots(source, start_ts)",
+    "ix_snapshots_uid": "schedule_snapshots(source, item_uid, start_ts)",
+    "ix_snapshots_scraped": "schedule_snapshots(scraped_at)",
+}
+
+# Target size of the JSON payload loaded per transaction; halved after a failed batch
+_BATCH_TARGET_BYTES = 10 * 1024 * 1024
+
 # Regex to extract timestamp from filename like "coolcharm_schedule_20250626_100932.json"
-TS_RE = re.compile(r".*_(\d{8})_(\d{6})\.json$")
+TS_RE = re.compile(r".*_(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})\.json")
 
 def parse_ts_from_name(name: str) -> datetime | None:
     """Parse timestamp from filename."""
-    m = TS_RE.match(name)
+    m = TS_RE.fullmatch(name)
     if not m:
         return None
-    d, t = m.group(1), m.group(2)
-    # Treat timestamps as UTC
-    return datetime.strptime(d + t, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+    # Treat timestamps as UTC; build the datetime straight from the digit groups
+    try:
+        return datetime(*map(int, m.groups()), tzinfo=timezone.utc)
+    except ValueError:
+        return None
 
 def coalesce(d: Dict[str, Any], *keys, default=None):
     """Return the first non-None, non-empty value from the dict."""
@@ -69,55 +105,6 @@ def parse_availability(availability_str: str) -> tuple[int | None, int | None]:
     
     return None, None
 
-def parse_datetime_from_date_time(date_str: str, time_str: str) -> datetime | None:
-    """Parse date and time strings into a datetime object."""
-    if not date_str or not time_str:
-        return None
-    
-    try:
-        # Handle date format like "26/06/2025"
-        if "/" in date_str:
-            day, month, year = date_str.split("/")
-            date_part = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-        else:
-            date_part = date_str
-        
-        # Handle time format like "17:30 - 18:25" (take start time)
-        if " - " in time_str:
-            start_time = time_str.split(" - ")[0].strip()
-        else:
-            start_time = time_str.strip()
-        
-        # Combine date and time
-        datetime_str = f"{date_part} {start_time}"
-        return datetime.strptime(datetime_str, "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
-    except (ValueError, IndexError):
-        return None
-
-def parse_end_datetime_from_date_time(date_str: str, time_str: str) -> datetime | None:
-    """Parse date and time strings into an end datetime object."""
-    if not date_str or not time_str:
-        return None
-    
-    try:
-        # Handle date format like "26/06/2025"
-        if "/" in date_str:
-            day, month, year = date_str.split("/")
-            date_part = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-        else:
-            date_part = date_str
-        
-        # Handle time format like "17:30 - 18:25" (take end time)
-        if " - " in time_str:
-            end_time = time_str.split(" - ")[1].strip()
-            # Combine date and time
-            datetime_str = f"{date_part} {end_time}"
-            return datetime.strptime(datetime_str, "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
-    except (ValueError, IndexError):
-        pass
-    
-    return None
-
 def ensure_schema(conn: psycopg.Connection):
     """Create tables if they don't exist."""
     with conn.cursor() as cur:
@@ -148,27 +135,44 @@ def ensure_schema(conn: psycopg.Connection):
           raw JSONB NOT NULL
         );
         """)
-        cur.execute("CREATE INDEX IF NOT EXISTS ix_snapshots_source_start ON schedule_snapshots(source, start_ts);")
-        cur.execute("CREATE INDEX IF NOT EXISTS ix_snapshots_uid ON schedule_snapshots(source, item_uid, start_ts);")
-        cur.execute("CREATE INDEX IF NOT EXISTS ix_snapshots_scraped ON schedule_snapshots(scraped_at);")
+        for name, target in _SNAPSHOT_INDEXES.items():
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target};")
+        # Content hash of every file already migrated, so re-runs can skip them
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS migrated_files (
+          path TEXT PRIMARY KEY,
+          sha256 BYTEA NOT NULL,
+          migrated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """)
 
-def insert_run(conn: psycopg.Connection, source: str, git_sha: str | None) -> str:
-    """Insert a new scrape run and return the run_id."""
-    run_id = str(uuid.uuid4())
+def fetch_migrated_digests(conn: psycopg.Connection, paths: List[str]) -> Dict[str, bytes]:
+    """Return the recorded SHA-256 digest of every given path that was migrated before."""
     with conn.cursor() as cur:
-        cur.execute(
-            "INSERT INTO scrape_runs (run_id, source, git_sha) VALUES (%s,%s,%s)",
-            (run_id, source, git_sha),
-        )
-    return run_id
-
-# Import the fixed field mapping function from db_utils
-from db_utils import as_rows
-
-def load_json(path: Path) -> List[Dict[str, Any]]:
-    """Load JSON file and return list of items."""
-    with path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+        cur.execute("SELECT path, sha256 FROM migrated_files WHERE path = ANY(%s::text[])", (paths,))
+        return {row["path"]: bytes(row["sha256"]) for row in cur}
+
+def insert_runs(conn: psycopg.Connection, runs: List[tuple]):
+    """Insert (run_id, source, git_sha) scrape runs in one statement, whatever their number."""
+    if not runs:
+        return
+    # Three array parameters keep the statement text fixed and clear of the
+    # 65535 bind-parameter limit a multi-row VALUES list runs into
+    run_ids, sources, git_shas = map(list, zip(*runs))
+    with conn.cursor() as cur:
+        # Every batch runs this same statement, so parse and plan it only once
+        cur.execute(_INSERT_RUNS_SQL, (run_ids, sources, git_shas), prepare=True)
+
+# Import the fixed field mapping function from the database utilities
+from src.database.utils import as_rows
+
+def load_json(raw: bytes) -> List[Dict[str, Any]]:
+    """Parse a JSON file's contents and return list of items."""
+    # orjson parses the raw bytes directly, skipping a separate UTF-8 decode.
+    # Whole-document parsing is deliberate: scraper files are a few hundred KB
+    # and peak memory is set by how many files parse_in_order keeps in flight;
+    # an incremental parser would only trim each file's parse, not that window.
+    data = orjson.loads(raw)
     
     if isinstance(data, list):
         return data
@@ -181,10 +185,199 @@ def load_json(path: Path) -> List[Dict[str, Any]]:
         return [data]
     return []
 
+def flatten_rowreformer(items: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Yield RowReformer's classes out of its nested week/day structure like the scraper does."""
+    if isinstance(items, list) and len(items) == 1 and isinstance(items[0], dict):
+        # This is likely a single nested object, treat it as the whole data
+        data = items[0]
+    elif isinstance(items, list):
+        # Multiple items, likely already processed
+        data = {f'week_{i}': {'classes': [item], 'date': item.get('date', '')} for i, item in enumerate(items)}
+    else:
+        data = items if isinstance(items, dict) else {}
+    
+    for week_day, week_data in data.items():
+        if isinstance(week_data, dict) and 'classes' in week_data:
+            for class_item in week_data['classes']:
+                class_item['week_day'] = week_day
+                class_item['date'] = week_data.get('date', '')
+                yield class_item
+
+def parse_file(migration: tuple, migrated_digest: bytes | None) -> tuple[List[tuple] | None, int, bytes]:
+    """
+    Load one JSON file and shape its items into snapshot rows; runs in a worker process.
+    
+    Returns the rows together with the file's size in bytes, which stands in
+    for the size of the raw JSONB payloads when batching, and its SHA-256
+    digest. Rows are None when the digest matches the one already migrated.
+    """
+    fp, source, scraped_at, run_id = migration
+    with open(fp, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).digest()
+    if digest == migrated_digest:
+        return None, len(raw), digest
+    items = load_json(raw)
+    
+    # Handle RowReformer's nested structure (files are mapped from 'row_')
+    if source == 'rowreformer':
+        items = flatten_rowreformer(items)
+    
+    return list(as_rows(source, run_id, scraped_at, items)), len(raw), digest
+
+def copy_batch(conn: psycopg.Connection, batch: List[tuple], git_sha: str):
+    """Insert a batch's runs, rows and file digests in one transaction."""
+    with conn.transaction():
+        insert_runs(conn, [(run_id, source, git_sha) for (_, source, _, run_id), _, _ in batch])
+        with conn.cursor() as cur:
+            with cur.copy(_COPY_SNAPSHOTS_SQL) as copy:
+                copy.set_types(_SNAPSHOT_TYPES)
+                for _, rows, _ in batch:
+                    for row in rows:
+                        copy.write_row(row)
+            
+            # Recorded in the same transaction, so a file counts as migrated
+            # exactly when its rows are committed
+            cur.execute(
+                """
+                INSERT INTO migrated_files (path, sha256)
+                SELECT * FROM unnest(%s::text[], %s::bytea[])
+                ON CONFLICT (path) DO UPDATE SET sha256 = EXCLUDED.sha256, migrated_at = NOW()
+                """,
+                ([fp for (fp, _, _, _), _, _ in batch], [digest for _, _, digest in batch]),
+            )
+
+def load_batch(conn: psycopg.Connection, batch: List[tuple], git_sha: str) -> bool:
+    """
+    Load a batch of (migration, rows, digest) entries, splitting it in halves on failure.
+    
+    Returns True if the batch had to be split.
+    """
+    try:
+        copy_batch(conn, batch, git_sha)
+        return False
+    except psycopg.OperationalError as e:
+        # Nothing to retry on a dead connection or a single file
+        if conn.broken or len(batch) == 1:
+            raise
+        print(f"Batch of {len(batch)} files failed ({e}), retrying in halves")
+    
+    half = len(batch) // 2
+    load_batch(conn, batch[:half], git_sha)
+    load_batch(conn, batch[half:], git_sha)
+    return True
+
+def migrate_rows(migrations: List[tuple], parsed: Iterable[tuple], git_sha: str):
+    """Load every parsed file, deferring index builds on an empty table."""
+    with psycopg.connect(DATABASE_URL, autocommit=True, row_factory=dict_row) as conn:
+        # Loading into an empty table is faster without live indexes; build
+        # them once the data is in (also if the load fails part-way)
+        with conn.cursor() as cur:
+            cur.execute("SELECT NOT EXISTS (SELECT 1 FROM schedule_snapshots) AS empty")
+            defer_indexes = cur.fetchone()["empty"]
+        if defer_indexes:
+            print("schedule_snapshots is empty; building its indexes after the load")
+            with conn.cursor() as cur:
+                for name in _SNAPSHOT_INDEXES:
+                    cur.execute(f"DROP INDEX IF EXISTS {name}")
+        
+        try:
+            load_all(conn, migrations, parsed, git_sha)
+        finally:
+            # On a dead connection this would only mask the original error
+            if not conn.closed:
+                build_snapshot_indexes(conn)
+
+def build_snapshot_indexes(conn: psycopg.Connection):
+    """Create any missing snapshot index, rebuilding those left invalid by a failed build."""
+    with conn.cursor() as cur:
+        # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind,
+        # which IF NOT EXISTS would otherwise skip on every later run
+        cur.execute("""
+            SELECT c.relname AS name
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = 'schedule_snapshots'::regclass
+            AND NOT i.indisvalid
+            AND c.relname = ANY(%s::text[])
+        """, (list(_SNAPSHOT_INDEXES),))
+        invalid = {row["name"] for row in cur.fetchall()}
+        
+        # The builds run one after another; CONCURRENTLY (possible because the
+        # connection is in autocommit) only keeps them from blocking writers
+        for name, target in _SNAPSHOT_INDEXES.items():
+            if name in invalid:
+                print(f"Index {name} is invalid; rebuilding it")
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            cur.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+
+def load_all(conn: psycopg.Connection, migrations: List[tuple], parsed: Iterable[tuple], git_sha: str):
+    """Load every parsed file in size-bounded batches, each in its own transaction."""
+    total = 0
+    skipped = 0
+    target_bytes = _BATCH_TARGET_BYTES
+    batch = []
+    batch_bytes = 0
+    
+    def flush():
+        nonlocal total, target_bytes, batch, batch_bytes
+        if load_batch(conn, batch, git_sha):
+            target_bytes = max(target_bytes // 2, 1)
+        for (fp, _, _, run_id), rows, _ in batch:
+            if not rows:
+                print(f"{fp}: No valid items found, skipping")
+                continue
+            total += len(rows)
+            print(f"{fp}: inserted {len(rows)} rows as run {run_id}")
+        batch = []
+        batch_bytes = 0
+    
+    # Each batch commits on its own, bounding transaction size; memory is
+    # bounded separately by the parse window in main
+    for migration, (rows, size, digest) in zip(migrations, parsed):
+        if rows is None:
+            skipped += 1
+            continue
+        batch.append((migration, rows, digest))
+        batch_bytes += size
+        if batch_bytes >= target_bytes:
+            flush()
+    if batch:
+        flush()
+    
+    if skipped:
+        print(f"Skipped {skipped} files already migrated with identical contents")
+    print(f"Migration complete! Inserted {total} rows total across {len(migrations) - skipped} files.")
+
+def parse_in_order(executor: Executor, migrations: List[tuple], digests: List[bytes | None], window: int) -> Iterator[tuple]:
+    """
+    Yield parse_file results in file order, keeping at most window files in flight.
+    
+    Executor.map would submit every file at once, letting finished row lists
+    pile up in this process faster than the database can load them.
+    """
+    pending = deque()
+    for migration, digest in zip(migrations, digests):
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(parse_file, migration, digest))
+    while pending:
+        yield pending.popleft().result()
+
+def iter_json_files(root: Path) -> Iterator[str]:
+    """Yield the paths of all .json files under root, walking it with os.scandir."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            # Like rglob, don't descend into symlinked directories
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_json_files(entry.path)
+            elif entry.name.endswith(".json"):
+                yield entry.path
+
 def main():
     """Main migration function."""
     git_sha = os.getenv("GITHUB_SHA") or "migration"
-    files = sorted(SCRAPED_DIR.rglob("*.json"))
+    files = sorted(iter_json_files(SCRAPED_DIR))
     
     if not files:
         print(f"No JSON files found under: {SCRAPED_DIR}")
@@ -192,67 +385,42 @@ def main():
 
     print(f"Found {len(files)} JSON files to migrate...")
     
-    with psycopg.connect(DATABASE_URL, autocommit=True, row_factory=dict_row) as conn:
-        ensure_schema(conn)
-        total = 0
+    # Work out every file's source, timestamp and run id up front so all runs
+    # can be inserted before the rows that reference them. Run ids are random
+    # UUIDs carved from a single os.urandom read rather than one per file.
+    entropy = os.urandom(16 * len(files))
+    migrations = []
+    for i, fp in enumerate(files):
+        name = os.path.basename(fp)
+        # Extract source from filename (e.g., "coolcharm_schedule_..." -> "coolcharm")
+        source = name.split("_", 1)[0].lower()
         
-        for fp in files:
-            name = fp.name
-            # Extract source from filename (e.g., "coolcharm_schedule_..." -> "coolcharm")
-            source = name.split("_", 1)[0].lower()
-            
-            # Map row -> rowreformer to match scraper source names
-            if source == 'row':
-                source = 'rowreformer'
-            
-            # Parse timestamp from filename or use file modification time
-            scraped_at = parse_ts_from_name(name) or datetime.fromtimestamp(fp.stat().st_mtime, tz=timezone.utc)
-            
-            # Insert scrape run
-            run_id = insert_run(conn, source, git_sha)
-            
-            # Load and process items
-            items = load_json(fp)
-            
-            # Handle RowReformer's nested structure (flatten like the scraper does)
-            if source == 'rowreformer':  # RowReformer files (mapped from 'row_')
-                flattened_items = []
-                if isinstance(items, list) and len(items) == 1 and isinstance(items[0], dict):
-                    # This is likely a single nested object, treat it as the whole data
-                    data = items[0]
-                elif isinstance(items, list):
-                    # Multiple items, likely already processed
-                    data = {f'week_{i}': {'classes': [item], 'date': item.get('date', '')} for i, item in enumerate(items)}
-                else:
-                    data = items if isinstance(items, dict) else {}
-                
-                for week_day, week_data in data.items():
-                    if isinstance(week_data, dict) and 'classes' in week_data:
-                        for class_item in week_data['classes']:
-                            class_item['week_day'] = week_day
-                            class_item['date'] = week_data.get('date', '')
-                            flattened_items.append(class_item)
-                items = flattened_items
-            
-            rows = list(as_rows(source, run_id, scraped_at, items))
-            
-            if not rows:
-                print(f"{fp}: No valid items found, skipping")
-                continue
-            
-            # Insert into database
-            with conn.cursor() as cur:
-                cur.executemany("""
-                    INSERT INTO schedule_snapshots
-                    (run_id, source, item_uid, class_name, instructor, location, start_ts, end_ts,
-                     capacity, spots_available, status, url, scraped_at, raw)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, rows)
-            
-            total += len(rows)
-            print(f"{fp}: inserted {len(rows)} rows as run {run_id}")
+        # Map row -> rowreformer to match scraper source names
+        if source == 'row':
+            source = 'rowreformer'
+        
+        # Parse timestamp from filename or use file modification time; the
+        # stat only happens for names without a timestamp
+        scraped_at = parse_ts_from_name(name) or datetime.fromtimestamp(os.stat(fp).st_mtime, tz=timezone.utc)
         
-        print(f"Migration complete! Inserted {total} rows total across {len(files)} files.")
+        run_id = str(uuid.UUID(bytes=entropy[16 * i:16 * (i + 1)], version=4))
+        migrations.append((fp, source, scraped_at, run_id))
+    
+    # Set up the schema and look up what earlier runs migrated in one short
+    # session, sending the statements back to back in pipeline mode
+    with psycopg.connect(DATABASE_URL, autocommit=True, row_factory=dict_row) as conn:
+        with conn.pipeline():
+            ensure_schema(conn)
+            migrated = fetch_migrated_digests(conn, files)
+    
+    # Parse files on every core while the main process streams finished rows
+    # to the database, with two files per worker in flight so memory stays
+    # bounded. The pool is started while no connection is open so workers
+    # never inherit a database socket.
+    workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parsed = parse_in_order(executor, migrations, [migrated.get(fp) for fp in files], 2 * workers)
+        migrate_rows(migrations, parsed, git_sha)
 
 if __name__ == "__main__":
     main()
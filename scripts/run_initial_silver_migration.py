@@ -10,16 +10,37 @@ Result: Migrated 113,971 bronze records → 5,794 unique silver classes
 """
 
 import os
+import sys
 from datetime import datetime, timezone, timedelta
+from pathlib import Path
 import psycopg
 from psycopg.rows import dict_row
-from silver_aggregation import SilverAggregator
 from dotenv import load_dotenv
 
+# Make the project root importable when run as a plain script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.silver_layer import SilverAggregator
+from src.silver_layer.aggregator import BRONZE_COLUMNS_SQL, CLASS_KEY_SQL
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Latest snapshot per (source, class key) in a date range, newest first; see
+# CLASS_KEY_SQL
+_LATEST_PER_CLASS_SQL = """
+    SELECT * FROM (
+        SELECT DISTINCT ON (s.source, class_key)
+            """ + BRONZE_COLUMNS_SQL + """,
+            """ + CLASS_KEY_SQL + """ AS class_key
+        FROM schedule_snapshots s
+        WHERE s.scraped_at >= %s AND s.scraped_at < %s
+        ORDER BY s.source, class_key, s.scraped_at DESC
+    ) latest
+    ORDER BY scraped_at DESC
+"""
+
 def run_migration_by_date_range():
     """Run migration in date chunks to handle large dataset safely"""
     
@@ -59,61 +80,42 @@ def run_migration_by_date_range():
             
             print(f"\n📅 Processing chunk: {current_date.date()} → {end_date.date()}")
             
-            # Get records for this date range
-            with conn.cursor(row_factory=dict_row) as cur:
-                cur.execute("""
-                    SELECT s.*, r.started_at as run_started_at, r.git_sha
-                    FROM schedule_snapshots s
-                    JOIN scrape_runs r ON s.run_id = r.run_id
-                    WHERE s.scraped_at >= %s AND s.scraped_at < %s
-                    ORDER BY s.source, s.scraped_at DESC
-                """, (current_date, end_date))
-                
-                chunk_records = cur.fetchall()
+            # Group by class_id and keep latest per class (like the original logic).
+            # generate_class_id is string normalisation plus a single hash call,
+            # with no numeric kernel that a JIT such as Numba could speed up.
+            class_groups = {}
+            record_count = 0
+            
+            # Stream this date range through a server-side cursor so only
+            # itersize rows (raw JSONB included) are held in memory at a time;
+            # named cursors need a transaction on an autocommit connection
+            with conn.transaction():
+                with conn.cursor(name="silver_chunk", row_factory=dict_row) as cur:
+                    cur.itersize = 5000
+                    # Postgres keeps only the latest snapshot per class key
+                    cur.execute(_LATEST_PER_CLASS_SQL, (current_date, end_date))
+                    
+                    for record in cur:
+                        record_count += 1
+                        # Rows arrive newest first, so the first one per class is the latest
+                        class_groups.setdefault(aggregator.generate_class_id(record), record)
             
-            if not chunk_records:
+            if not record_count:
                 print(f"  No records in this chunk")
                 current_date = end_date
                 continue
                 
-            print(f"  Found {len(chunk_records):,} records")
-            
-            # Group by class_id and keep latest per class (like the original logic)
-            class_groups = {}
-            for record in chunk_records:
-                class_id = aggregator.generate_class_id(record)
-                
-                # Keep the most recent record per class
-                if class_id not in class_groups or record['scraped_at'] > class_groups[class_id]['scraped_at']:
-                    class_groups[class_id] = record
-            
+            print(f"  Found {record_count:,} latest-per-class records")
             print(f"  Deduplicated to {len(class_groups):,} unique classes")
             
-            # Process each class
-            now = datetime.now(timezone.utc)
-            chunk_inserted = 0
-            chunk_updated = 0
+            # Enhance records with missing temporal/capacity data from raw JSON
+            staged = [
+                (class_id, aggregator.enhance_record_with_raw_data(latest_record))
+                for class_id, latest_record in class_groups.items()
+            ]
             
-            for class_id, latest_record in class_groups.items():
-                # Enhance record with missing temporal/capacity data from raw JSON
-                enhanced_record = aggregator.enhance_record_with_raw_data(latest_record)
-                
-                start_ts = enhanced_record['start_ts']
-                is_past = start_ts < now if start_ts else False
-                
-                # Check if class already exists in silver
-                existing = aggregator.get_existing_silver_record(conn, class_id)
-                
-                if existing:
-                    # Only update if the new record is more recent
-                    if enhanced_record['scraped_at'] > existing['last_scraped_at']:
-                        if not existing['is_past']:  # Don't update past classes
-                            aggregator.update_silver_record(conn, class_id, enhanced_record, is_past)
-                            chunk_updated += 1
-                else:
-                    # New class - insert
-                    aggregator.insert_silver_record(conn, class_id, enhanced_record, is_past)
-                    chunk_inserted += 1
+            # Insert new classes and update newer, non-past ones in one round trip
+            chunk_inserted, chunk_updated, _ = aggregator.upsert_silver_records(conn, staged)
             
             total_processed += len(class_groups)
             total_inserted += chunk_inserted
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Dashboard Launcher
+
+Starts the Streamlit dashboard in-process instead of spawning a subprocess.
+"""
+
+import sys
+from pathlib import Path
+
+DASHBOARD_PATH = Path(__file__).parent / "app.py"
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+FLAG_OPTIONS = {
+    "server.port": 8501,
+    "server.address": "localhost",
+}
+
+
+def main():
+    """Launch the Streamlit dashboard."""
+    if not DASHBOARD_PATH.exists():
+        print(f"Error: Dashboard file not found at {DASHBOARD_PATH}")
+        sys.exit(1)
+    
+    # Check if .env file exists
+    env_path = PROJECT_ROOT / ".env"
+    if not env_path.exists():
+        print("Warning: .env file not found. Make sure DATABASE_URL is set.")
+    
+    print("Starting Pilates Bookings Dashboard...")
+    print(f"Dashboard will be available at: http://localhost:{FLAG_OPTIONS['server.port']}")
+    print("Press Ctrl+C to stop the dashboard")
+    
+    # Same launcher `streamlit run` uses internally, without a second interpreter
+    from streamlit.web import bootstrap
+    
+    try:
+        bootstrap.load_config_options(flag_options=FLAG_OPTIONS)
+        bootstrap.run(str(DASHBOARD_PATH), False, [], FLAG_OPTIONS)
+    except KeyboardInterrupt:
+        print("\nDashboard stopped.")
+
+
+if __name__ == "__main__":
+    main()
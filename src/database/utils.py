@@ -4,12 +4,18 @@ Database utilities for storing scraper results in PostgreSQL.
 """
 
 import os
+import re
 import uuid
-import json
+import zlib
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import orjson
 import psycopg
 from psycopg import sql
+from psycopg.conninfo import make_conninfo
+from psycopg.copy import QueuedLibpqWriter
+from psycopg.types.json import Jsonb
+from psycopg_pool import ConnectionPool
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -17,11 +23,61 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+def build_conninfo(url: str) -> str:
+    """Add TCP keepalive and application_name settings to a connection URL."""
+    return make_conninfo(
+        url,
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=5,
+        application_name="piscraper",
+    )
+
+# Parsed once at import so every connection shares the same settings
+_CONNINFO = build_conninfo(DATABASE_URL) if DATABASE_URL else None
+
+_INSERT_RUN_SQL = "INSERT INTO scrape_runs (run_id, source, git_sha) VALUES (%s, %s, %s)"
+
+_COPY_SNAPSHOTS_SQL = """
+    COPY schedule_snapshots
+    (run_id, source, item_uid, class_name, instructor, location, start_ts, end_ts,
+     capacity, spots_available, status, url, scraped_at, raw)
+    FROM STDIN WITH (FORMAT BINARY)
+"""
+
+_SNAPSHOT_TYPES = [
+    "text", "text", "text", "text", "text", "text", "timestamptz", "timestamptz",
+    "int4", "int4", "text", "text", "timestamptz", "jsonb",
+]
+
+# Shared pool so repeated writes reuse one physical connection
+_POOL: Optional[ConnectionPool] = None
+
+# DSNs whose schema has already been verified by this process
+_SCHEMA_READY: Set[str] = set()
+# Stable advisory lock key so concurrent writers don't race on DDL
+_SCHEMA_LOCK_ID = zlib.crc32(b"piscraper_schema")
+
+def get_pool() -> ConnectionPool:
+    """Get the shared connection pool, opening it on first use."""
+    global _POOL
+    if not DATABASE_URL:
+        raise ValueError("DATABASE_URL environment variable not set")
+    if _POOL is None:
+        _POOL = ConnectionPool(
+            _CONNINFO,
+            min_size=1,
+            max_size=4,
+            open=True,
+        )
+    return _POOL
+
 def get_connection():
     """Get a database connection."""
     if not DATABASE_URL:
         raise ValueError("DATABASE_URL environment variable not set")
-    return psycopg.connect(DATABASE_URL)
+    return psycopg.connect(_CONNINFO)
 
 def ensure_schema(conn: psycopg.Connection):
     """Create tables if they don't exist."""
@@ -62,14 +118,22 @@ def ensure_schema(conn: psycopg.Connection):
         cur.execute("CREATE INDEX IF NOT EXISTS ix_snapshots_uid ON schedule_snapshots(source, item_uid, start_ts);")
         cur.execute("CREATE INDEX IF NOT EXISTS ix_snapshots_scraped ON schedule_snapshots(scraped_at);")
 
+def _ensure_schema_once(conn: psycopg.Connection):
+    """Run ensure_schema once per process and DSN, serialized by an advisory lock."""
+    dsn = conn.info.dsn
+    if dsn in _SCHEMA_READY:
+        return
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_SCHEMA_LOCK_ID,))
+        ensure_schema(conn)
+    _SCHEMA_READY.add(dsn)
+
 def insert_run(conn: psycopg.Connection, source: str, git_sha: Optional[str] = None) -> str:
     """Insert a new scrape run and return the run_id."""
     run_id = str(uuid.uuid4())
     with conn.cursor() as cur:
-        cur.execute(
-            "INSERT INTO scrape_runs (run_id, source, git_sha) VALUES (%s, %s, %s)",
-            (run_id, source, git_sha),
-        )
+        cur.execute(_INSERT_RUN_SQL, (run_id, source, git_sha), prepare=True)
     return run_id
 
 def coalesce(d: Dict[str, Any], *keys, default=None):
@@ -98,87 +162,169 @@ def parse_availability(availability_str: str) -> tuple[Optional[int], Optional[i
     
     return None, None
 
-def parse_datetime_from_date_time(date_str: str, time_str: str) -> Optional[datetime]:
-    """Parse date and time strings into a datetime object."""
-    if not date_str or not time_str:
-        return None
+# Date like "26/06/2025" (or ISO "2025-06-26") and time like "17:30" or "17:30 - 18:25"
+_DATE_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+_ISO_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_TIME_RE = re.compile(r"(\d{1,2}):(\d{1,2})(?:\s*-\s*(\d{1,2}):(\d{1,2}))?")
+
+def _parse_canonical(date_str: str, time_str: str):
+    """
+    Parse canonical "DD/MM/YYYY" with "HH:MM" or "HH:MM - HH:MM" using ASCII arithmetic.
     
+    Returns None when the strings are not in that exact shape.
+    """
     try:
-        # Handle date format like "26/06/2025"
-        if "/" in date_str:
-            day, month, year = date_str.split("/")
-            date_part = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-        else:
-            date_part = date_str
-        
-        # Handle time format like "17:30 - 18:25" (take start time)
-        if " - " in time_str:
-            start_time = time_str.split(" - ")[0].strip()
-        else:
-            start_time = time_str.strip()
-        
-        # Combine date and time
-        datetime_str = f"{date_part} {start_time}"
-        return datetime.strptime(datetime_str, "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
-    except (ValueError, IndexError):
+        d = date_str.encode("ascii")
+        t = time_str.encode("ascii")
+    except UnicodeEncodeError:
+        return None
+    
+    # 47 == "/", 58 == ":", 528 == 11 * ord("0"), 53328 == 1111 * ord("0")
+    if len(d) != 10 or d[2] != 47 or d[5] != 47 or not (d[:2] + d[3:5] + d[6:]).isdigit():
+        return None
+    n = len(t)
+    if n not in (5, 13) or t[2] != 58 or not (t[:2] + t[3:5]).isdigit():
+        return None
+    if n == 13 and (t[5:8] != b" - " or t[10] != 58 or not (t[8:10] + t[11:]).isdigit()):
         return None
+    
+    day = d[0] * 10 + d[1] - 528
+    month = d[3] * 10 + d[4] - 528
+    year = d[6] * 1000 + d[7] * 100 + d[8] * 10 + d[9] - 53328
+    
+    start = datetime(year, month, day, t[0] * 10 + t[1] - 528, t[3] * 10 + t[4] - 528, tzinfo=timezone.utc)
+    end = None
+    if n == 13:
+        try:
+            end = datetime(year, month, day, t[8] * 10 + t[9] - 528, t[11] * 10 + t[12] - 528, tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    return start, end
 
-def parse_end_datetime_from_date_time(date_str: str, time_str: str) -> Optional[datetime]:
-    """Parse date and time strings into an end datetime object."""
+def parse_start_end(date_str: str, time_str: str) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Parse date and time strings into (start, end) datetimes, parsing the date only once."""
     if not date_str or not time_str:
-        return None
+        return None, None
     
+    # Fast path for the shape every scraper emits; regexes handle the rest
     try:
-        # Handle date format like "26/06/2025"
-        if "/" in date_str:
-            day, month, year = date_str.split("/")
-            date_part = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-        else:
-            date_part = date_str
-        
-        # Handle time format like "17:30 - 18:25" (take end time)
-        if " - " in time_str:
-            end_time = time_str.split(" - ")[1].strip()
-            # Combine date and time
-            datetime_str = f"{date_part} {end_time}"
-            return datetime.strptime(datetime_str, "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
-    except (ValueError, IndexError):
-        pass
+        parsed = _parse_canonical(date_str, time_str)
+    except ValueError:
+        return None, None
+    if parsed is not None:
+        return parsed
     
+    m = _DATE_RE.fullmatch(date_str)
+    if m:
+        day, month, year = int(m.group(1)), int(m.group(2)), int(m.group(3))
+    else:
+        m = _ISO_DATE_RE.fullmatch(date_str)
+        if not m:
+            return None, None
+        year, month, day = int(m.group(1)), int(m.group(2)), int(m.group(3))
+    
+    t = _TIME_RE.fullmatch(time_str.strip())
+    if not t:
+        return None, None
+    
+    try:
+        start = datetime(year, month, day, int(t.group(1)), int(t.group(2)), tzinfo=timezone.utc)
+    except ValueError:
+        return None, None
+    
+    end = None
+    if t.group(3) is not None:
+        try:
+            end = datetime(year, month, day, int(t.group(3)), int(t.group(4)), tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    
+    return start, end
+
+# Candidate keys per snapshot column, checked in order
+_FIELD_MAP = {
+    "item_uid": ("id", "uid", "external_id", "slug"),
+    "location": ("location", "studio", "address"),
+    "class_name": ("class_name", "title", "name", "type"),
+    "instructor": ("instructor", "teacher"),
+    "date": ("date", "start_date"),
+    "time": ("time", "start_time", "hour"),
+    "availability": ("availability", "available", "spots_available", "free_spots"),
+    "status": ("status", "booking_status", "state"),
+    "url": ("url", "link"),
+}
+
+# Source-specific overrides of _FIELD_MAP
+_SOURCE_FIELD_MAPS = {
+    # Rite uses "address" and "name" instead of "location" and "class_name"
+    "rite": {
+        "location": ("address", "location", "studio"),
+        "class_name": ("name", "class_name", "title", "type"),
+    },
+}
+
+def _extract(item: Dict[str, Any], keys) -> Any:
+    """Return the first non-None, non-empty value from the item for the given keys."""
+    for k in keys:
+        v = item.get(k)
+        if v is not None and v != "":
+            return v
     return None
 
-def as_rows(source: str, run_id: str, scraped_at: datetime, items: List[Dict[str, Any]]):
-    """Convert items to database rows with source-specific field mapping."""
-    for item in items:
+def _field_getter(keys):
+    """Build a getter that tries the primary key before falling back to the other candidates."""
+    primary, fallbacks = keys[0], keys[1:]
+    
+    def get(item: Dict[str, Any]) -> Any:
+        v = item.get(primary)
+        if v is not None and v != "":
+            return v
+        return _extract(item, fallbacks)
+    
+    return get
+
+def _row_transform(source: str, run_id: str, scraped_at: datetime):
+    """Build the item -> row function for one batch, with field getters resolved up front."""
+    field_map = {**_FIELD_MAP, **_SOURCE_FIELD_MAPS.get(source, {})}
+    get_uid = _field_getter(field_map["item_uid"])
+    get_location = _field_getter(field_map["location"])
+    get_class_name = _field_getter(field_map["class_name"])
+    get_instructor = _field_getter(field_map["instructor"])
+    get_date = _field_getter(field_map["date"])
+    get_time = _field_getter(field_map["time"])
+    get_availability = _field_getter(field_map["availability"])
+    get_status = _field_getter(field_map["status"])
+    get_url = _field_getter(field_map["url"])
+    is_koepel = source == "koepel"
+    is_rowreformer = source == "rowreformer"
+    # Items in a scrape share a handful of (date, time) slots; parse each once
+    parsed_slots: Dict[Tuple[str, str], Tuple[Optional[datetime], Optional[datetime]]] = {}
+    
+    def transform(item: Dict[str, Any]) -> tuple:
         # Parse availability
-        availability_str = coalesce(item, "availability", "available", "spots_available", "free_spots")
+        availability_str = get_availability(item)
         spots_available, capacity = parse_availability(availability_str) if availability_str else (None, None)
         
-        # Source-specific field mapping
-        if source == "rite":
-            # Rite uses "address" instead of "location"
-            location = coalesce(item, "address", "location", "studio")
-            class_name = coalesce(item, "name", "class_name", "title", "type")
-            instructor = coalesce(item, "instructor", "teacher")
-            date_str = coalesce(item, "date", "start_date")
-            time_str = coalesce(item, "time", "start_time", "hour")
-        elif source == "koepel":
+        location = get_location(item)
+        class_name = get_class_name(item)
+        instructor = get_instructor(item)
+        date_str = get_date(item)
+        time_str = get_time(item)
+        
+        if is_koepel:
             # Koepel has limited fields, derive class_name from context
-            location = coalesce(item, "location", "studio", "address") or "Unknown Location"
-            class_name = coalesce(item, "class_name", "title", "name", "type") or "Group Class"
-            instructor = coalesce(item, "instructor", "teacher")
-            date_str = coalesce(item, "date", "start_date")
-            time_str = coalesce(item, "time", "start_time", "hour")
-        elif source == "rowreformer":
+            location = location or "Unknown Location"
+            class_name = class_name or "Group Class"
+        elif is_rowreformer:
             # RowReformer uses nested structure with details array
             details = item.get("details", [])
             if len(details) >= 6:
                 # details = [class_name, time, level, instructor, location, availability, status]
                 class_name = details[0] if details[0] else "ROW Class"
-                location = details[4] if len(details) > 4 and details[4] else "ROW Studio"
-                instructor = details[3] if len(details) > 3 and details[3] else None
-                time_str = details[1] if len(details) > 1 and details[1] else None
-                availability_str = details[5] if len(details) > 5 and details[5] else None
+                location = details[4] if details[4] else "ROW Studio"
+                instructor = details[3] if details[3] else None
+                time_str = details[1] if details[1] else None
+                availability_str = details[5] if details[5] else None
                 # Override the parsed availability with details array data
                 if availability_str:
                     spots_available, capacity = parse_availability(availability_str)
@@ -188,23 +334,21 @@ def as_rows(source: str, run_id: str, scraped_at: datetime, items: List[Dict[str
                 location = "ROW Studio"
                 instructor = None
                 time_str = None
-            date_str = coalesce(item, "date", "start_date")
-        else:
-            # Default mapping for other sources (coolcharm, etc.)
-            location = coalesce(item, "location", "studio", "address")
-            class_name = coalesce(item, "class_name", "title", "name", "type")
-            instructor = coalesce(item, "instructor", "teacher")
-            date_str = coalesce(item, "date", "start_date")
-            time_str = coalesce(item, "time", "start_time", "hour")
         
         # Parse datetime (after source-specific field mapping)
-        start_ts = parse_datetime_from_date_time(date_str, time_str) if date_str and time_str else None
-        end_ts = parse_end_datetime_from_date_time(date_str, time_str) if date_str and time_str else None
+        if date_str and time_str:
+            slot = (date_str, time_str)
+            parsed = parsed_slots.get(slot)
+            if parsed is None:
+                parsed = parsed_slots[slot] = parse_start_end(date_str, time_str)
+            start_ts, end_ts = parsed
+        else:
+            start_ts, end_ts = None, None
         
-        yield (
+        return (
             run_id,
             source,
-            coalesce(item, "id", "uid", "external_id", "slug"),
+            get_uid(item),
             class_name,
             instructor,
             location,
@@ -212,43 +356,64 @@ def as_rows(source: str, run_id: str, scraped_at: datetime, items: List[Dict[str
             end_ts,
             capacity,
             spots_available,
-            coalesce(item, "status", "booking_status", "state"),
-            coalesce(item, "url", "link"),
+            get_status(item),
+            get_url(item),
             scraped_at,
-            json.dumps(item),
+            Jsonb(item, dumps=orjson.dumps),
         )
+    
+    return transform
 
-def write_snapshots(source: str, items: List[Dict[str, Any]]):
-    """Write schedule snapshots to the database."""
+def as_rows(source: str, run_id: str, scraped_at: datetime, items: List[Dict[str, Any]]):
+    """Convert items to database rows with source-specific field mapping."""
+    return map(_row_transform(source, run_id, scraped_at), items)
+
+def write_snapshots(source: str, items: Iterable[Dict[str, Any]], conn: Optional[psycopg.Connection] = None) -> Optional[str]:
+    """
+    Write schedule snapshots to the database.
+    
+    The schema check commits first, in its own advisory-locked transaction;
+    the run insert and bulk copy then share a single transaction.
+    When no connection is supplied, one is borrowed from the shared pool.
+    Items may be any iterable; rows are formatted on the calling thread while
+    a background writer streams them to the server.
+    Returns the run_id of the inserted scrape run.
+    """
     if not DATABASE_URL:
         raise RuntimeError("DATABASE_URL not set. Please set it in your .env file.")
     
     if not items:
         print(f"No items to write for source: {source}")
-        return
+        return None
+    
+    if conn is None:
+        with get_pool().connection() as pooled_conn:
+            return write_snapshots(source, items, conn=pooled_conn)
     
     now = datetime.now(timezone.utc)
     git_sha = os.getenv("GITHUB_SHA")
     
-    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
-        ensure_schema(conn)
+    _ensure_schema_once(conn)
+    
+    with conn.transaction():
         run_id = insert_run(conn, source, git_sha)
         
-        rows = list(as_rows(source, run_id, now, items))
-        
-        if rows:
-            with conn.cursor() as cur:
-                # Use executemany for psycopg 3
-                cur.executemany("""
-                    INSERT INTO schedule_snapshots
-                    (run_id, source, item_uid, class_name, instructor, location, start_ts, end_ts,
-                     capacity, spots_available, status, url, scraped_at, raw)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, rows)
-            
-            print(f"Successfully wrote {len(rows)} schedule snapshots for {source} (run_id: {run_id})")
-        else:
-            print(f"No valid rows generated for source: {source}")
+        with conn.cursor() as cur:
+            # Stream rows through binary COPY; the queued writer sends data from a
+            # background thread so network I/O overlaps with row building
+            with cur.copy(_COPY_SNAPSHOTS_SQL, writer=QueuedLibpqWriter(cur)) as copy:
+                copy.set_types(_SNAPSHOT_TYPES)
+                count = 0
+                for row in as_rows(source, run_id, now, items):
+                    copy.write_row(row)
+                    count += 1
+    
+    if count:
+        print(f"Successfully wrote {count} schedule snapshots for {source} (run_id: {run_id})")
+    else:
+        print(f"No valid rows generated for source: {source}")
+    
+    return run_id
 
 def test_connection():
     """Test the database connection."""
@@ -257,7 +422,7 @@ def test_connection():
         return False
     
     try:
-        with psycopg.connect(DATABASE_URL) as conn:
+        with psycopg.connect(_CONNINFO) as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT 1")
                 result = cur.fetchone()
@@ -4,13 +4,13 @@ Base Scraper Class
 Provides common functionality for all fitness studio scrapers.
 """
 
-import json
 import os
 import uuid
 from abc import ABC, abstractmethod
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
+import orjson
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
@@ -25,10 +25,25 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 try:
-    from ..database.utils import get_connection, insert_run, write_snapshots
+    from ..database.utils import get_connection, write_snapshots
 except ImportError:
     # Fallback for direct script execution
-    from src.database.utils import get_connection, insert_run, write_snapshots
+    from src.database.utils import get_connection, write_snapshots
+
+
+# Only text is scraped, so skip downloading images and web fonts.
+# Stylesheets stay enabled: innerText depends on the rendered layout.
+CONTENT_SETTINGS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.fonts": 2,
+}
+
+# Static assets and trackers never needed for text scraping
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp",
+    "*.woff", "*.woff2", "*.ttf",
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*",
+]
 
 
 class BaseScraper(ABC):
@@ -64,11 +79,16 @@ class BaseScraper(ABC):
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
+        chrome_options.add_experimental_option("prefs", CONTENT_SETTINGS)
         
         service = Service(ChromeDriverManager().install())
         driver = webdriver.Chrome(service=service, options=chrome_options)
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
+        # Block static assets and trackers at the network layer as well
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+        
         return driver
     
     def save_data(self, data: List[Dict[str, Any]]) -> bool:
@@ -83,12 +103,8 @@ class BaseScraper(ABC):
         """
         try:
             with get_connection() as conn:
-                # Insert run record
-                git_sha = os.getenv("GITHUB_SHA")
-                self.run_id = insert_run(conn, self.source_name, git_sha)
-                
-                # Insert snapshot data
-                write_snapshots(self.source_name, data)
+                # Insert run record and snapshot data in one transaction
+                self.run_id = write_snapshots(self.source_name, data, conn=conn)
                 
             print(f"✅ Saved {len(data)} records to database")
             return True
@@ -115,8 +131,15 @@ class BaseScraper(ABC):
             
             os.makedirs("scraped_data", exist_ok=True)
             
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, default=str, ensure_ascii=False)
+            # Stream one record per line rather than building the whole document;
+            # the result is still a plain JSON array for the migration script
+            with open(filename, "wb") as f:
+                f.write(b"[\n")
+                for i, item in enumerate(data):
+                    if i:
+                        f.write(b",\n")
+                    f.write(orjson.dumps(item, default=str))
+                f.write(b"\n]\n")
                 
             print(f"💾 Fallback: Saved {len(data)} records to {filename}")
             return True
@@ -7,242 +7,326 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from time import sleep
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import json
-
-# Set up Chrome options
-chrome_options = Options()
-chrome_options.add_argument("--headless")  # Run in headless mode
-chrome_options.add_argument("--window-size=1920,1080")  # Desktop resolution
-chrome_options.add_argument("--start-maximized")  # Maximize window
-chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.7103.92 Safari/537.36")  # Desktop user agent
-chrome_options.add_argument('--disable-blink-features=AutomationControlled')  # Hide automation
-chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])  # Hide automation
-chrome_options.add_experimental_option('useAutomationExtension', False)  # Hide automation
+from functools import lru_cache
+from typing import NamedTuple
+import hashlib
+import orjson
+import os
+import sys
 
-# Initialize the Chrome driver
-driver = webdriver.Chrome(service=Service("/usr/local/bin/chromedriver"), options=chrome_options)
+# Add the project root to Python path to handle imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# Mask WebDriver to avoid detection
-driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+try:
+    from ..database.utils import write_snapshots
+    from .base import BLOCKED_URLS, CONTENT_SETTINGS
+except ImportError:
+    # Fallback for direct script execution
+    from src.database.utils import write_snapshots
+    from src.scrapers.base import BLOCKED_URLS, CONTENT_SETTINGS
+
+# chromedriver ships with the image; each concurrent driver needs its own Service
+CHROMEDRIVER_PATH = "/usr/local/bin/chromedriver"
+
+
+class ClassRow(NamedTuple):
+    """One scraped class, shared by both studio schedules."""
+    date: str
+    time: str
+    class_name: str
+    location: str
+    availability: str
+    booking_status: str
+
+
+# Locators used on every week
+SCHEDULE_GROUP = (By.CLASS_NAME, "ScheduleListGroup")
+NEXT_WEEK_BUTTON = (By.XPATH, "/html/body/div/div/div/div/div[2]/div/div/div/div[3]/span/i")
+
+# Harvests every schedule group on the current week in a single WebDriver
+# round trip; missing nodes come back as null instead of raising. With one
+# call per week the WebDriver hop is no longer the bottleneck, so this stays
+# on Selenium like the other scrapers rather than a separate CDP/Playwright stack.
+SCHEDULE_JS = """
+const text = (root, selector) => {
+  const el = root.querySelector(selector);
+  return el ? el.innerText.trim() : null;
+};
+return Array.from(document.querySelectorAll('.ScheduleListGroup')).map(group => ({
+  date: text(group, '.ScheduleListGroup_date') || '',
+  items: Array.from(group.querySelectorAll('.ScheduleListItem')).map(item => ({
+    title: text(item, '.ScheduleListItem_title') || '',
+    time: text(item, '.ScheduleListItem_time') || '',
+    location: text(item, '.ScheduleListItem_location'),
+    location_label: text(item, '.ScheduleListItem_location span') || '',
+    participants: text(item, '.ScheduleListItem_participants .level-left'),
+    status: text(item, '.SessionBookButton'),
+  })),
+}));
+"""
+
+FIRST_DATE_JS = """
+const el = document.querySelector('.ScheduleListGroup_date');
+return el ? el.innerText.trim() : null;
+"""
+
+# Locale-independent month lookup for the schedule date headers
+MONTHS = {
+    'JANUARY': '01', 'JAN': '01',
+    'FEBRUARY': '02', 'FEB': '02',
+    'MARCH': '03', 'MAR': '03',
+    'APRIL': '04', 'APR': '04',
+    'MAY': '05',
+    'JUNE': '06', 'JUN': '06',
+    'JULY': '07', 'JUL': '07',
+    'AUGUST': '08', 'AUG': '08',
+    'SEPTEMBER': '09', 'SEP': '09',
+    'OCTOBER': '10', 'OCT': '10',
+    'NOVEMBER': '11', 'NOV': '11',
+    'DECEMBER': '12', 'DEC': '12'
+}
+
+
+@lru_cache(maxsize=64)
+def parse_date_header(date_text):
+    """Convert a date header (e.g. "SATURDAY 10 MAY" or "TODAY") to "10/05/2025"."""
+    # Handle "TODAY" case
+    if date_text.upper() == "TODAY":
+        today = datetime.now()
+        return f"{today.day:02d}/{today.month:02d}/{today.year}"
 
-url = "https://coolcharmpilates.trainin.app/widget/schedule"
-driver.get(url)
-print("WebDriver initialized successfully")
+    try:
+        parts = date_text.split()  # e.g. ["SATURDAY", "10", "MAY"]
+        day, month = parts[1], parts[2].upper()
+        return f"{int(day):02d}/{MONTHS.get(month, '00')}/2025"
+    except (ValueError, IndexError) as e:
+        print(f"Error parsing date {date_text}: {e}")
+        return date_text  # Fallback to original text if parsing fails
+
+
+def click_next_week(driver, button=None):
+    """Click the next-week arrow, reusing the located element until it goes stale."""
+    if button is not None:
+        try:
+            button.click()
+            return button
+        except StaleElementReferenceException:
+            pass  # The widget re-rendered its header; locate the arrow again
+
+    button = driver.find_element(*NEXT_WEEK_BUTTON)
+    button.click()
+    return button
+
+
+def week_changed(previous_date):
+    """Wait condition: the first date header shows a different day than before."""
+    def condition(driver):
+        current_date = driver.execute_script(FIRST_DATE_JS)
+        return current_date is not None and current_date != previous_date
+    return condition
+
+
+def create_driver():
+    """Start a headless Chrome configured like a desktop browser."""
+    # Set up Chrome options
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Run in headless mode
+    chrome_options.add_argument("--window-size=1920,1080")  # Desktop resolution
+    chrome_options.add_argument("--start-maximized")  # Maximize window
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.7103.92 Safari/537.36")  # Desktop user agent
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')  # Hide automation
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])  # Hide automation
+    chrome_options.add_experimental_option('useAutomationExtension', False)  # Hide automation
+    chrome_options.add_experimental_option("prefs", CONTENT_SETTINGS)  # Skip images and fonts
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-background-timer-throttling")
+    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+    chrome_options.add_argument("--disable-renderer-backgrounding")
+    chrome_options.add_argument("--disable-features=TranslateUI")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_argument("--disable-dev-shm-usage")  # Small /dev/shm in containers
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+
+    # Initialize the Chrome driver
+    driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=chrome_options)
+
+    # Mask WebDriver to avoid detection
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+
+    # Block static assets at the network layer as well
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+    return driver
 
 
 # In[69]:
 
 
-# Initialize list to store all classes
-all_classes = []
-
-# Scrape two weeks of data
-for week in range(4):
-    # Wait for the schedule list to load
+def scrape_main_studio(driver, weeks=4):
+    """Scrape the main studio schedule from the currently loaded widget."""
+    classes = []
     wait = WebDriverWait(driver, 10)
-    schedule_list = wait.until(EC.presence_of_element_located((By.CLASS_NAME, "ScheduleListGroup")))
-
-    # Find all schedule groups
-    schedule_groups = driver.find_elements(By.CLASS_NAME, "ScheduleListGroup")
-
-    # Iterate through each group
-    for group in schedule_groups:
-        # Get the date header and convert to standard format
-        date_text = group.find_element(By.CLASS_NAME, "ScheduleListGroup_date").text.strip()
-        
-        # Handle "TODAY" case
-        if date_text.upper() == "TODAY":
-            today = datetime.now()
-            date = f"{today.day:02d}/{today.month:02d}/{today.year}"
-        else:
-            # Parse the date (e.g., "SATURDAY 10 MAY" to "10/05/2025")
-            try:
-                day_month = ' '.join(date_text.split()[1:])  # Get "10 MAY"
-                # Handle month names properly - some months have different formats
-                date_parts = day_month.split()
-                day = date_parts[0]
-                month = date_parts[1].capitalize()
-                
-                # Use locale-independent month parsing
-                month_dict = {
-                    'JANUARY': '01', 'JAN': '01',
-                    'FEBRUARY': '02', 'FEB': '02',
-                    'MARCH': '03', 'MAR': '03',
-                    'APRIL': '04', 'APR': '04',
-                    'MAY': '05',
-                    'JUNE': '06', 'JUN': '06',
-                    'JULY': '07', 'JUL': '07',
-                    'AUGUST': '08', 'AUG': '08',
-                    'SEPTEMBER': '09', 'SEP': '09',
-                    'OCTOBER': '10', 'OCT': '10',
-                    'NOVEMBER': '11', 'NOV': '11',
-                    'DECEMBER': '12', 'DEC': '12'
-                }
-                
-                month_num = month_dict.get(month.upper(), '00')
-                date = f"{int(day):02d}/{month_num}/2025"  # Format to "10/05/2025"
-            except (ValueError, KeyError) as e:
-                print(f"Error parsing date {date_text}: {e}")
-                date = date_text  # Fallback to original text if parsing fails
-
-        # Find all class items in this group
-        class_items = group.find_elements(By.CLASS_NAME, "ScheduleListItem")
-
-        # Process each class
-        for item in class_items:
-            try:
-                location = item.find_element(By.CLASS_NAME, "ScheduleListItem_location").text.strip()
-            except NoSuchElementException:
-                location = "Location not specified"
-
-            try:
-                availability = item.find_element(By.CLASS_NAME, "ScheduleListItem_participants").find_element(By.CLASS_NAME, "level-left").text.strip()
-            except NoSuchElementException:
-                availability = "Not specified"
-
-            try:
-                booking_status = item.find_element(By.CLASS_NAME, "SessionBookButton").text.strip()
-            except NoSuchElementException:
-                booking_status = "Unknown"
-
-            class_data = {
-                "date": date,
-                "time": item.find_element(By.CLASS_NAME, "ScheduleListItem_time").text.split('\n')[0].strip(),
-                "class_name": item.find_element(By.CLASS_NAME, "ScheduleListItem_title").text.strip(),
-                "location": location,
-                "availability": availability,
-                "booking_status": booking_status
-            }
-            all_classes.append(class_data)
-
-    # Click next week button if not on last iteration
-    if week < 3:
-        next_week_button = driver.find_element(By.XPATH, "/html/body/div/div/div/div/div[2]/div/div/div/div[3]/span/i")
-        next_week_button.click()
-        print("Clicked next week button")
-        sleep(5)  # Wait for new data to load
-
-# Convert to JSON structure
-# print(json.dumps({"classes": all_classes}, indent=2))
-
-driver.quit()
+    next_week_button = None
 
+    for week in range(weeks):
+        # Wait for the schedule list to load
+        wait.until(EC.presence_of_element_located(SCHEDULE_GROUP))
 
-# In[70]:
+        # Collect all schedule groups and their classes in one call
+        schedule_groups = driver.execute_script(SCHEDULE_JS)
 
+        # Iterate through each group
+        for group in schedule_groups:
+            # Get the date header and convert to standard format
+            date = parse_date_header(group["date"])
 
-url = "https://coolcharmpilates-studios.trainin.app/widget/schedule"
-# Set up Chrome options
-chrome_options = Options()
-chrome_options.add_argument("--headless")  # Run in headless mode
-chrome_options.add_argument("--window-size=1920,1080")  # Desktop resolution
-chrome_options.add_argument("--start-maximized")  # Maximize window
-chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.7103.92 Safari/537.36")  # Desktop user agent
-chrome_options.add_argument('--disable-blink-features=AutomationControlled')  # Hide automation
-chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])  # Hide automation
-chrome_options.add_experimental_option('useAutomationExtension', False)  # Hide automation
+            # Process each class
+            for item in group["items"]:
+                location = item["location"]
+                availability = item["participants"]
+                booking_status = item["status"]
+
+                classes.append(ClassRow(
+                    date=date,
+                    time=item["time"].split('\n')[0].strip(),
+                    class_name=item["title"],
+                    location=location if location is not None else "Location not specified",
+                    availability=availability if availability is not None else "Not specified",
+                    booking_status=booking_status if booking_status is not None else "Unknown"
+                ))
 
-# Initialize the Chrome driver
-driver = webdriver.Chrome(service=Service("/usr/local/bin/chromedriver"), options=chrome_options)
+        # Click next week button if not on last iteration
+        if week < weeks - 1:
+            next_week_button = click_next_week(driver, next_week_button)
+            print("Clicked next week button")
+            # Continue as soon as the next week has rendered
+            wait.until(week_changed(schedule_groups[0]["date"] if schedule_groups else None))
 
-# Mask WebDriver to avoid detection
-driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    return classes
 
-driver.get(url)
-print("WebDriver initialized successfully")
 
+# In[70]:
 
-# In[71]:
 
+def scrape_studios(driver, weeks=3):
+    """Scrape the CoolCharm Studios schedule from the currently loaded widget."""
+    classes = []
+    wait = WebDriverWait(driver, 10)
+    next_week_button = None
 
-# Scrape four weeks of data
-for week in range(3):
-    try:
-        # Wait for the schedule list to load
-        wait = WebDriverWait(driver, 10)
-        schedule_list = wait.until(EC.presence_of_element_located((By.CLASS_NAME, "ScheduleListGroup")))
-
-        # Find all schedule groups
-        schedule_groups = driver.find_elements(By.CLASS_NAME, "ScheduleListGroup")
-        
-        if not schedule_groups:
-            print("No schedule groups found, ending scrape")
-            break
+    for week in range(weeks):
+        try:
+            # Wait for the schedule list to load
+            wait.until(EC.presence_of_element_located(SCHEDULE_GROUP))
 
-        # Process each schedule group
-        for group in schedule_groups:
-            # Get the date header and convert to standard format
-            date_text = group.find_element(By.CSS_SELECTOR, "div.ScheduleListGroup div.ScheduleListGroup_date.heading").text.strip()
+            # Collect all schedule groups and their classes in one call
+            schedule_groups = driver.execute_script(SCHEDULE_JS)
             
-            # Parse the date with special handling for "TODAY"
-            try:
-                if date_text.upper() == "TODAY":
-                    date_obj = datetime.now()
-                else:
-                    # Extract day and month (e.g., "SATURDAY 10 MAY" -> "10 MAY")
-                    day_month = ' '.join(date_text.split()[1:])
-                    # Parse with year 2025 (based on context)
-                    date_obj = datetime.strptime(f"{day_month} 2025", "%d %b %Y")
-                # Format to "10/05/2025"
-                date = date_obj.strftime("%d/%m/%Y")
-            except ValueError as e:
-                print(f"Error parsing date {date_text}: {e}")
-                date = date_text  # Fallback to default date if parsing fails
+            if not schedule_groups:
+                print("No schedule groups found, ending scrape")
+                break
+
+            # Process each schedule group
+            for group in schedule_groups:
+                # Get the date header and convert to standard format
+                date = parse_date_header(group["date"])
+
+                # Process each class
+                for item in group["items"]:
+                    availability = item["participants"]
+                    booking_status = item["status"]
+
+                    classes.append(ClassRow(
+                        date=date,
+                        time=item["time"],
+                        class_name=item["title"],
+                        location=item["location_label"],
+                        availability=availability if availability is not None else "Not specified",
+                        booking_status=booking_status if booking_status is not None else "Unknown"
+                    ))
+
+            # Click next week button if not on last iteration
+            if week < weeks - 1:
+                next_week_button = click_next_week(driver, next_week_button)
+                print("Clicked next week button")
+                # Continue as soon as the next week has rendered
+                wait.until(week_changed(schedule_groups[0]["date"]))
                 
-            # Find all class items in this group
-            class_items = group.find_elements(By.CLASS_NAME, "ScheduleListItem")
-            
-            # Process each class
-            for item in class_items:
-                class_data = {
-                    "type": item.find_element(By.CLASS_NAME, "ScheduleListItem_title").text.strip(),
-                    "time": item.find_element(By.CLASS_NAME, "ScheduleListItem_time").text.strip(),
-                    "location": item.find_element(By.CLASS_NAME, "ScheduleListItem_location").find_element(By.TAG_NAME, "span").text.strip(),
-                    "status": item.find_element(By.CLASS_NAME, "ScheduleListItem_bookColumn").find_element(By.CLASS_NAME, "SessionBookButton").text.strip(),
-                    "date": date,
-                }
-                all_classes.append(class_data)
+        except TimeoutException:
+            print("Timeout waiting for schedule list, ending scrape")
+            break
+        except Exception as e:
+            print(f"Error during scraping: {e}")
+            break
+
+    return classes
+
+
+def scrape(url, scrape_schedule):
+    """Load one widget URL in its own browser and scrape it."""
+    driver = create_driver()
+    try:
+        driver.get(url)
+        print(f"Loaded {url}")
+        return scrape_schedule(driver)
+    finally:
+        driver.quit()
 
-        # Click next week button if not on last iteration
-        if week < 2:
-            next_week_button = driver.find_element(By.XPATH, "/html/body/div/div/div/div/div[2]/div/div/div/div[3]/span/i")
-            next_week_button.click()
-            print("Clicked next week button")
-            sleep(5)  # Wait for new data to load
-            
-    except TimeoutException:
-        print("Timeout waiting for schedule list, ending scrape")
-        break
-    except Exception as e:
-        print(f"Error during scraping: {e}")
-        break
 
-driver.quit()
+# The trainin.app widget renders its schedule client-side. Its JSON backend
+# (URL, auth headers, field names) has not been captured yet, so the schedule
+# is still read from the rendered DOM.
+SCHEDULES = [
+    ("https://coolcharmpilates.trainin.app/widget/schedule", scrape_main_studio),
+    ("https://coolcharmpilates-studios.trainin.app/widget/schedule", scrape_studios),
+]
+
+# The two studios are independent, so scrape them concurrently; each worker
+# spends most of its time waiting on the browser.
+with ThreadPoolExecutor(max_workers=len(SCHEDULES)) as executor:
+    futures = [executor.submit(scrape, url, scrape_schedule) for url, scrape_schedule in SCHEDULES]
+    all_classes = [row for future in futures for row in future.result()]
 
 
 # In[72]:
 
 
-import os
-import sys
+def save_json(classes):
+    """
+    Save the scraped classes to a timestamped JSON file.
 
-# Add the project root to Python path to handle imports
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
+    Returns the file path, or None when the schedule is identical to the
+    last saved one and no file was written.
+    """
+    output_dir = "scraped_data"
+    os.makedirs(output_dir, exist_ok=True)
 
-try:
-    from ..database.utils import write_snapshots
-except ImportError:
-    # Fallback for direct script execution
-    from src.database.utils import write_snapshots
+    # Fingerprint the schedule independent of scrape order
+    payload = orjson.dumps([row._asdict() for row in sorted(classes)], option=orjson.OPT_INDENT_2)
+    fingerprint = hashlib.blake2b(payload, digest_size=16).hexdigest()
+    fingerprint_file = os.path.join(output_dir, ".coolcharm_last.hash")
+    if os.path.exists(fingerprint_file):
+        with open(fingerprint_file) as f:
+            if f.read().strip() == fingerprint:
+                return None
+
+    current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_file = os.path.join(output_dir, f"coolcharm_schedule_{current_datetime}.json")
+    with open(output_file, "wb") as f:
+        f.write(payload)
+    with open(fingerprint_file, "w") as f:
+        f.write(fingerprint)
+    return output_file
 
 # Count the number of classes scraped
 num_classes = len(all_classes)
@@ -251,27 +335,23 @@ print(f"Scraped {num_classes} classes")
 # Write to database if DATABASE_URL is set
 if os.getenv("DATABASE_URL"):
     try:
-        write_snapshots("coolcharm", all_classes)
+        write_snapshots("coolcharm", (row._asdict() for row in all_classes))
         print("Successfully wrote data to database")
     except Exception as e:
         print(f"Error writing to database: {e}")
         # Fallback to JSON if database write fails
-        current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_dir = "scraped_data"
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, f"coolcharm_schedule_{current_datetime}.json")
-        with open(output_file, "w") as f:
-            json.dump(all_classes, f, indent=2)
-        print(f"Fallback: Saved schedule data to {output_file}")
+        output_file = save_json(all_classes)
+        if output_file:
+            print(f"Fallback: Saved schedule data to {output_file}")
+        else:
+            print("Fallback: Schedule unchanged since last save, skipping JSON write")
 else:
     # Fallback to JSON when running locally without DATABASE_URL
-    current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = "scraped_data"
-    os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(output_dir, f"coolcharm_schedule_{current_datetime}.json")
-    with open(output_file, "w") as f:
-        json.dump(all_classes, f, indent=2)
-    print(f"Saved schedule data to {output_file}")
+    output_file = save_json(all_classes)
+    if output_file:
+        print(f"Saved schedule data to {output_file}")
+    else:
+        print("Schedule unchanged since last save, skipping JSON write")
 
 
 def main():
@@ -8,7 +8,7 @@ Scrapes fitness class schedules from Koepel studio website.
 import re
 import time
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
@@ -33,6 +33,73 @@ except ImportError:
     # Fallback for direct script execution
     from src.scrapers.base import BaseScraper
 
+# Classifies a modal line as date, time, capacity or instructor; alternatives are
+# tried in that order, so e.g. a Dutch date is never taken for an instructor name
+_DETAIL_LINE_RE = re.compile(
+    r"^(?:"
+    r"(?P<date>(?:maandag|dinsdag|woensdag|donderdag|vrijdag|zaterdag|zondag)\s+\d{2}\s+[a-z]+\s*)"
+    r"|(?P<time>\d{2}:\d{2}\s*-\s*\d{2}:\d{2}\s*)"
+    r"|(?P<capacity>\d+\s*/\s*\d+\s*)"
+    r"|(?P<instructor>[A-Za-z\s]+)"
+    r")$",
+    re.IGNORECASE,
+)
+
+# Words that mark a line as a class description rather than an instructor name
+_NON_INSTRUCTOR_KEYWORDS = ("pilates", "reformer", "core", "lichaam")
+
+# Ids of this week's clickable class events, in page order
+_EVENT_IDS_JS = """
+return Array.from(document.querySelectorAll("div[onclick*='openScheduleModal']")).map(el => el.id);
+"""
+
+# Scrolls a class event into view and opens its modal; false if it is gone
+_OPEN_EVENT_JS = """
+const el = document.getElementById(arguments[0]);
+if (!el) {
+  return false;
+}
+el.scrollIntoView({block: 'center'});
+el.click();
+return true;
+"""
+
+# Optionally dismisses the open modal (arguments[0]), then resolves as soon as it
+# is hidden and its backdrop is gone (Bootstrap hides .modal-content rather than
+# removing it), or with the final state after arguments[1] ms
+_CLOSE_MODAL_JS = """
+const [dismiss, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const closed = () => {
+  const content = document.querySelector('.modal-content');
+  return (!content || content.offsetParent === null) && !document.querySelector('.modal-backdrop');
+};
+const button = document.querySelector("button.close[data-dismiss='modal'][data-cy='modalDismissBtn']");
+if (dismiss && button) {
+  button.click();
+} else if (dismiss && window.jQuery) {
+  jQuery('.modal').modal('hide');
+}
+if (closed()) {
+  done(true);
+  return;
+}
+const observer = new MutationObserver(() => {
+  if (closed()) {
+    observer.disconnect();
+    clearTimeout(timer);
+    done(true);
+  }
+});
+const timer = setTimeout(() => {
+  observer.disconnect();
+  done(closed());
+}, timeoutMs);
+observer.observe(document.body, {attributes: true, childList: true, subtree: true});
+"""
+
+_ESCAPE_KEY = {"key": "Escape", "code": "Escape", "windowsVirtualKeyCode": 27}
+
 
 class KoepelScraper(BaseScraper):
     """Scraper for Koepel fitness studio."""
@@ -52,30 +119,25 @@ class KoepelScraper(BaseScraper):
         
         while scraped_count < self.max_classes:
             try:
-                # Get all clickable event elements
-                elements = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_all_elements_located((By.XPATH, "//div[contains(@onclick, 'openScheduleModal')]"))
+                # Class details are only read from the rendered modal: the request
+                # openScheduleModal makes has not been captured, so there is no
+                # JSON endpoint to replay yet. Reading it from the CDP performance
+                # log (Network.getResponseBody) would also need its URL pattern and
+                # payload shape before the modal clicks could be dropped.
+                # Get the ids of all clickable events in one query
+                event_ids = WebDriverWait(self.driver, 10).until(
+                    lambda driver: driver.execute_script(_EVENT_IDS_JS) or False
                 )
                 
-                for element in elements:
+                for event_id in event_ids:
                     if scraped_count >= self.max_classes:
                         break
                     
                     try:
-                        # Scroll into view and click
-                        self.driver.execute_script(
-                            "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", 
-                            element
-                        )
-                        WebDriverWait(self.driver, 5).until(
-                            EC.element_to_be_clickable((By.ID, element.get_attribute("id")))
-                        ).click()
-                        
                         # Extract modal details
-                        modal_content = WebDriverWait(self.driver, 10).until(
-                            EC.visibility_of_element_located((By.CSS_SELECTOR, ".modal-content"))
-                        )
-                        details_text = modal_content.find_element(By.CSS_SELECTOR, ".modal-body").text
+                        details_text = self._read_event_details(event_id)
+                        if details_text is None:
+                            continue
                         
                         # Parse class details
                         class_data = self._parse_class_details(details_text)
@@ -109,6 +171,38 @@ class KoepelScraper(BaseScraper):
         print(f"Scraped {len(class_details)} classes")
         return class_details
     
+    def _read_event_details(self, event_id: str, attempts: int = 3) -> Optional[str]:
+        """
+        Open an event's modal and return its text.
+        
+        The event is looked up by id on every attempt, so a re-rendered page
+        is retried with a fresh element instead of dropping the class.
+        
+        Args:
+            event_id: DOM id of the clickable event
+            attempts: How many times to try opening the modal
+            
+        Returns:
+            The modal body text, or None if the event could not be opened
+        """
+        for attempt in range(1, attempts + 1):
+            try:
+                # Scroll into view and click
+                if not self.driver.execute_script(_OPEN_EVENT_JS, event_id):
+                    print(f"Event {event_id} disappeared before it could be opened")
+                    return None
+                
+                modal_body = WebDriverWait(self.driver, 10).until(
+                    EC.visibility_of_element_located((By.CSS_SELECTOR, ".modal-content .modal-body"))
+                )
+                return modal_body.text
+                
+            except (ElementClickInterceptedException, TimeoutException, StaleElementReferenceException) as e:
+                print(f"Error opening event {event_id} (attempt {attempt}/{attempts}): {e}")
+                self._recover_from_modal_error()
+        
+        return None
+    
     def _parse_class_details(self, details_text: str) -> Dict[str, Any]:
         """Parse class details from modal text."""
         details_lines = details_text.split('\n')
@@ -126,62 +220,32 @@ class KoepelScraper(BaseScraper):
             if not line or "Welkom bij" in line or "Tot snel!" in line:
                 continue
                 
-            # Date pattern (Dutch weekdays)
-            if re.match(r"^(maandag|dinsdag|woensdag|donderdag|vrijdag|zaterdag|zondag)\s+\d{2}\s+[a-z]+\s*$", line, re.IGNORECASE):
-                filtered_details["date"] = line
-            # Time pattern
-            elif re.match(r"^\d{2}:\d{2}\s*-\s*\d{2}:\d{2}\s*$", line):
-                filtered_details["time"] = line
-            # Capacity pattern
-            elif re.match(r"^\d+\s*/\s*\d+\s*$", line):
-                filtered_details["capacity"] = line
+            match = _DETAIL_LINE_RE.match(line)
+            if match is None:
+                continue
+            
+            field = match.lastgroup
             # Instructor pattern (names only, excluding class descriptions)
-            elif re.match(r"^[A-Za-z\s]+$", line) and not any(
-                keyword in line.lower() for keyword in ["pilates", "reformer", "core", "lichaam"]
+            if field == "instructor" and any(
+                keyword in line.lower() for keyword in _NON_INSTRUCTOR_KEYWORDS
             ):
-                filtered_details["instructor"] = line
+                continue
+            
+            filtered_details[field] = line
         
         return filtered_details
     
     def _close_modal(self):
-        """Close the modal dialog with multiple fallback methods."""
-        max_attempts = 3
-        
-        for attempt in range(max_attempts):
-            try:
-                # Method 1: Click close button
-                close_button = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "button.close[data-dismiss='modal'][data-cy='modalDismissBtn']"))
-                )
-                self.driver.execute_script("arguments[0].click();", close_button)
-                
-                # Verify modal is closed
-                if WebDriverWait(self.driver, 3).until(
-                    EC.invisibility_of_element_located((By.CSS_SELECTOR, ".modal-content"))
-                ):
-                    break
-                    
-            except Exception:
-                if attempt == 0:
-                    # Method 2: Try XPath approach
-                    try:
-                        close_xpath = WebDriverWait(self.driver, 3).until(
-                            EC.element_to_be_clickable((By.XPATH, "//button[@class='close' and @data-dismiss='modal' and @data-cy='modalDismissBtn']"))
-                        )
-                        self.driver.execute_script("arguments[0].click();", close_xpath)
-                    except Exception:
-                        pass
-                elif attempt == 1:
-                    # Method 3: JavaScript dismiss
-                    self.driver.execute_script("$('.modal').modal('hide');")
-                    self.driver.execute_script("document.querySelector('.modal-backdrop')?.remove();")
-                    self.driver.execute_script("document.body.classList.remove('modal-open');")
+        """Close the modal with Escape, falling back to its close button and then a forced dismiss."""
+        # Bootstrap modals close on Escape; sending it over CDP skips the
+        # click and focus handling of the close button
+        for event_type in ("keyDown", "keyUp"):
+            self.driver.execute_cdp_cmd("Input.dispatchKeyEvent", {"type": event_type, **_ESCAPE_KEY})
+        if self.driver.execute_async_script(_CLOSE_MODAL_JS, False, 1000):
+            return
         
-        # Ensure modal is fully closed
-        WebDriverWait(self.driver, 5).until(
-            EC.invisibility_of_element_located((By.CSS_SELECTOR, ".modal-content"))
-        )
-        time.sleep(1)
+        if not self.driver.execute_async_script(_CLOSE_MODAL_JS, True, 3000):
+            self._recover_from_modal_error()
     
     def _recover_from_modal_error(self):
         """Recover from modal interaction errors."""
@@ -192,7 +256,6 @@ class KoepelScraper(BaseScraper):
             WebDriverWait(self.driver, 5).until(
                 EC.invisibility_of_element_located((By.CSS_SELECTOR, ".modal-content"))
             )
-            time.sleep(1)
         except Exception:
             pass
     
@@ -213,8 +276,14 @@ class KoepelScraper(BaseScraper):
             except Exception:
                 pass
             
+            # Wait for this week's events to be replaced rather than sleeping
+            current_events = self.driver.find_elements(By.CSS_SELECTOR, "div[onclick*='openScheduleModal']")
             self.driver.execute_script("arguments[0].click();", next_button)
-            time.sleep(4)
+            if current_events:
+                try:
+                    WebDriverWait(self.driver, 10).until(EC.staleness_of(current_events[0]))
+                except TimeoutException:
+                    pass  # Updated in place; the next event lookup picks up the new week
             return True
             
         except TimeoutException:
@@ -7,7 +7,6 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -16,6 +15,7 @@ from time import sleep
 import sys
 import os
 import json
+from collections import Counter, defaultdict
 from datetime import datetime
 
 # Add the project root to Python path to handle imports
@@ -25,9 +25,11 @@ if project_root not in sys.path:
 
 try:
     from ..database.utils import write_snapshots
+    from .base import BLOCKED_URLS, CONTENT_SETTINGS
 except ImportError:
     # Fallback for direct script execution
     from src.database.utils import write_snapshots
+    from src.scrapers.base import BLOCKED_URLS, CONTENT_SETTINGS
 
 # Set up Chrome options
 chrome_options = Options()
@@ -38,6 +40,7 @@ chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64
 chrome_options.add_argument('--disable-blink-features=AutomationControlled')  # Hide automation
 chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])  # Hide automation
 chrome_options.add_experimental_option('useAutomationExtension', False)  # Hide automation
+chrome_options.add_experimental_option("prefs", CONTENT_SETTINGS)  # Skip images and web fonts; only text is scraped
 
 # Initialize the Chrome driver
 driver = webdriver.Chrome(service=Service("/usr/local/bin/chromedriver"), options=chrome_options)
@@ -45,6 +48,10 @@ driver = webdriver.Chrome(service=Service("/usr/local/bin/chromedriver"), option
 # Mask WebDriver to avoid detection
 driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
 
+# Block static assets and trackers at the network layer as well
+driver.execute_cdp_cmd("Network.enable", {})
+driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+
 url = "https://rite.trainin.app/widget/schedule?trackingconsent=no"
 driver.get(url)
 print("WebDriver initialized successfully")
@@ -56,12 +63,38 @@ print("WebDriver initialized successfully")
 import json
 import re
 from datetime import datetime
+from functools import lru_cache
 import os
 
+# Date headers and bookable classes in page order, with their visible text,
+# collected in one round trip instead of .text + get_attribute per element
+SCHEDULE_ENTRIES_JS = """
+return Array.from(document.querySelectorAll('div.ScheduleListGroup_header, div.ScheduleListItem.is-bookable')).map(el => ({
+  is_header: el.className.includes('ScheduleListGroup_header'),
+  text: el.getClientRects().length ? el.innerText.trim() : '',
+}));
+"""
+
+WEEKDAYS = ("MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY")
+
+
+@lru_cache(maxsize=64)
+def format_schedule_date(date):
+    """Convert a header like "SATURDAY 10 MAY" to dd/mm/yyyy; other values pass through."""
+    if any(day in date for day in WEEKDAYS):
+        # Parse date like "SATURDAY 10 MAY"
+        date_obj = datetime.strptime(date, "%A %d %B")
+        # Set year to current year
+        date_obj = date_obj.replace(year=datetime.now().year)
+        # Format as dd/mm/yyyy
+        date = date_obj.strftime("%d/%m/%Y")
+    return date
+
 try:
     # Wait for schedule items and headers to load
     wait = WebDriverWait(driver, 10)
-    all_elements = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.ScheduleListGroup_header, div.ScheduleListItem.is-bookable")))
+    wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.ScheduleListGroup_header, div.ScheduleListItem.is-bookable")))
+    all_elements = driver.execute_script(SCHEDULE_ENTRIES_JS)
 
     # Initialize variables
     reform_classes = []
@@ -70,10 +103,10 @@ try:
 
     # Process each element
     for element in all_elements:
-        text = element.text.strip()
+        text = element["text"]
 
         # Check if the element is a date header
-        if element.get_attribute("class").find("ScheduleListGroup_header") != -1:
+        if element["is_header"]:
             current_date = text
             continue
 
@@ -90,15 +123,8 @@ try:
                 address = lines[3]
                 availability = lines[4]
 
-                # Convert date format
-                date = today_date if current_date == "TODAY" else current_date
-                if "SATURDAY" in date or "SUNDAY" in date or "MONDAY" in date or "TUESDAY" in date or "WEDNESDAY" in date or "THURSDAY" in date or "FRIDAY" in date:
-                    # Parse date like "SATURDAY 10 MAY"
-                    date_obj = datetime.strptime(date, "%A %d %B")
-                    # Set year to current year
-                    date_obj = date_obj.replace(year=datetime.now().year)
-                    # Format as dd/mm/yyyy
-                    date = date_obj.strftime("%d/%m/%Y")
+                # Convert date format (parsed once per day header)
+                date = format_schedule_date(today_date if current_date == "TODAY" else current_date)
 
                 # Create class dictionary
                 class_info = {
@@ -149,27 +175,27 @@ else:
     print(f"Saved schedule data to {filename}")
 
     # Check if all expected fields are populated correctly
-    expected_fields = ["name", "date", "hour", "address", "instructor", "availability"]
-    missing_fields = {}
+    expected_fields = frozenset(("name", "date", "hour", "address", "instructor", "availability"))
+    missing_fields = defaultdict(list)
+    location_counts = Counter()
 
+    # Collect missing fields and locations in a single pass
     for i, class_data in enumerate(reform_classes):
-        for field in expected_fields:
-            if field not in class_data or not class_data[field]:
-                if field not in missing_fields:
-                    missing_fields[field] = []
-                missing_fields[field].append(i)
+        location_counts[class_data.get("address", "")] += 1
+        populated = {field for field, value in class_data.items() if value}
+        for field in expected_fields - populated:
+            missing_fields[field].append(i)
 
     if missing_fields:
         print("Warning: Some fields are missing or empty:")
-        for field, indices in missing_fields.items():
+        for field, indices in sorted(missing_fields.items()):
             print(f"  - Field '{field}' is missing in {len(indices)} classes (indices: {indices[:5]}{'...' if len(indices) > 5 else ''})")
     else:
         print("All expected fields are populated correctly in all classes")
 
     # Print distinct locations if available
-    distinct_locations = set(class_data.get("address", "") for class_data in reform_classes)
-    print(f"\nFound {len(distinct_locations)} distinct locations:")
-    for location in sorted(distinct_locations):
+    print(f"\nFound {len(location_counts)} distinct locations:")
+    for location in sorted(location_counts):
         if location:  # Only print non-empty locations
             print(f"  - {location}")
 
@@ -7,36 +7,101 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
 
-# Set up Chrome options
-chrome_options = Options()
-chrome_options.add_argument("--headless")  # Run in headless mode
-chrome_options.add_argument("--window-size=1920,1080")  # Desktop resolution
-chrome_options.add_argument("--start-maximized")  # Maximize window
-# chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.7103.92 Safari/537.36")  # Desktop user agent
+# Add the project root to Python path to handle imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# Initialize the Chrome driver
-driver = webdriver.Chrome(service=Service("/usr/local/bin/chromedriver"), options=chrome_options)
+try:
+    from ..database.utils import write_snapshots
+    from .base import BLOCKED_URLS, CONTENT_SETTINGS
+except ImportError:
+    # Fallback for direct script execution
+    from src.database.utils import write_snapshots
+    from src.scrapers.base import BLOCKED_URLS, CONTENT_SETTINGS
+
+# Returns, per week card, every class block's element texts in document order
+# (elements with a direct text node, like the XPath ".//*[text()]"). Hidden
+# elements yield "" just as WebElement.text would, all in one round trip.
+WEEK_TEXTS_JS = """
+const hasTextNode = el => Array.from(el.childNodes).some(n => n.nodeType === Node.TEXT_NODE);
+const visibleText = el => el.getClientRects().length ? el.innerText.trim() : '';
+return Array.from(document.querySelectorAll('.bs-week-card')).map(card =>
+  Array.from(card.querySelectorAll('.bs-week__cardMode__offerRow__item, .bs-week__cardMode__offerRow__offer-wrapper')).map(block =>
+    Array.from(block.querySelectorAll('*')).filter(hasTextNode).map(visibleText)
+  )
+);
+"""
+
+# Clicks the next-week arrow and resolves once the week cards have changed and
+# the DOM has been quiet for 250 ms, or with false after 10 s
+NEXT_WEEK_JS = """
+const done = arguments[arguments.length - 1];
+const snapshot = () => Array.from(document.querySelectorAll('.bs-week-card')).map(card => card.textContent).join('\\u0000');
+const before = snapshot();
+const button = document.querySelector('button.bs-marketplace-date-picker__right-button');
+if (!button) {
+  done(false);
+  return;
+}
+let settle = null;
+const finish = result => {
+  observer.disconnect();
+  clearTimeout(settle);
+  clearTimeout(timeout);
+  done(result);
+};
+const observer = new MutationObserver(() => {
+  if (document.querySelector('.bs-week-card') && snapshot() !== before) {
+    clearTimeout(settle);
+    settle = setTimeout(() => finish(true), 250);
+  }
+});
+const timeout = setTimeout(() => finish(false), 10000);
+observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+button.click();
+"""
+
+# Booking button labels; each one closes the class whose details precede it
+STATUS_TEXTS = frozenset({"RESERVEER", "WACHTLIJST", "BINNENKORT BESCHIKBAAR"})
+
+
+def create_driver():
+    """Start a headless Chrome for the RowReformer schedule."""
+    # Set up Chrome options
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Run in headless mode
+    chrome_options.add_argument("--window-size=1920,1080")  # Desktop resolution
+    chrome_options.add_argument("--start-maximized")  # Maximize window
+    # chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.7103.92 Safari/537.36")  # Desktop user agent
+    chrome_options.add_experimental_option("prefs", CONTENT_SETTINGS)  # Skip images and web fonts; only text is scraped
+
+    # Initialize the Chrome driver
+    driver = webdriver.Chrome(service=Service("/usr/local/bin/chromedriver"), options=chrome_options)
+
+    # Block static assets and trackers at the network layer as well
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+    return driver
 
 
 # In[3]:
 
 
-# URL to scrape
+# URL to scrape. The schedule is a bsport marketplace widget (the bs-* classes)
+# embedded in the site, not a trainin.app page; its offers come from bsport's
+# API, which needs the studio's company id and signed widget parameters that
+# have not been captured yet. Until that request is recorded from a real
+# session, the rendered widget remains the only reliable source.
 url = "https://www.rowreformer.com/schedule"
-driver.get(url)
-print("WebDriver initialized successfully")
-
-# Wait for page to load
-sleep(10)
-# Find all week cards for current week
-week_cards = driver.find_elements(By.CSS_SELECTOR, ".bs-week-card")
 
 # Get current date and calculate dates for the weeks
 from datetime import datetime, timedelta
@@ -48,79 +113,94 @@ monday = current_date - timedelta(days=current_date.weekday())
 # Initialize variables
 days_of_week = ["Maandag", "Dinsdag", "Woensdag", "Donderdag", "Vrijdag", "Zaterdag", "Zondag"]
 num_days = 7
-schedule_data = {}
+num_weeks = 4  # current + 3 upcoming
+
+
+def click_next_week(driver):
+    """Advance the schedule widget by one week, returning once it has rendered."""
+    if not driver.execute_async_script(NEXT_WEEK_JS):
+        raise TimeoutException("Next week's schedule did not load")
 
-# Process 4 weeks (current + 3 upcoming)
-for week_num in range(1, 5):
+
+def scrape_week(week_num):
+    """Scrape one week (1 = current week) in its own browser and return its schedule entries."""
     # Calculate dates for this week
     week_dates = [(monday + timedelta(days=i + (7 * (week_num-1)))) for i in range(7)]
 
-    # Initialize week in schedule data
-    for i, day in enumerate(days_of_week):
+    # Build this week's day keys once and initialize week in schedule data
+    day_keys = [f"Week {week_num} {day}" for day in days_of_week]
+    schedule_data = {}
+    for i, day_key in enumerate(day_keys):
         date = week_dates[i]
-        schedule_data[f"Week {week_num} {day}"] = {
+        schedule_data[day_key] = {
             'date': date.strftime('%d/%m/%Y'),
             'classes': []
         }
 
-    # Process each week card
-    week_cards = driver.find_elements(By.CSS_SELECTOR, ".bs-week-card")
+    driver = create_driver()
+    try:
+        driver.get(url)
+
+        # Wait for the schedule blocks to render instead of a fixed delay
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".bs-week__cardMode__offerRow__item, .bs-week__cardMode__offerRow__offer-wrapper"))
+        )
 
-    for week_card in week_cards:
-        # Get all blocks in this card
-        blocks = week_card.find_elements(By.CSS_SELECTOR, ".bs-week__cardMode__offerRow__item, .bs-week__cardMode__offerRow__offer-wrapper")
+        # The widget has no per-week URL, so seek to this week by clicking forward
+        for _ in range(week_num - 1):
+            click_next_week(driver)
 
-        # Group blocks by day
-        for block_index in range(0, len(blocks), num_days):
-            day_blocks = blocks[block_index:block_index + num_days]
+        # Collect the text of every block in every week card in one call
+        week_cards = driver.execute_script(WEEK_TEXTS_JS)
 
-            # Process each day's block
-            for day_index, block in enumerate(day_blocks):
-                if day_index >= len(days_of_week):
-                    break
+        for blocks in week_cards:
+            # Group blocks by day
+            for block_index in range(0, len(blocks), num_days):
+                day_blocks = blocks[block_index:block_index + num_days]
 
-                # Extract text elements from this block
-                text_elements = block.find_elements(By.XPATH, ".//*[text()]")
+                # Process each day's block
+                for day_index, block_texts in enumerate(day_blocks):
+                    if day_index >= len(days_of_week):
+                        break
 
-                # Build class info dictionary
-                class_info = {}
-                current_info = []
+                    # Build class info dictionary
+                    day_classes = schedule_data[day_keys[day_index]]['classes']
+                    class_info = {}
+                    current_info = []
 
-                # Process text elements to remove duplicates
-                seen_texts = set()
-                for element in text_elements:
-                    text = element.text.strip()
-                    if text and text not in seen_texts:
-                        seen_texts.add(text)
-                        if text in ['RESERVEER', 'WACHTLIJST', "BINNENKORT BESCHIKBAAR"]:
+                    # Drop empty and repeated texts in one pass, keeping first-seen order
+                    for text in dict.fromkeys(filter(None, block_texts)):
+                        if text in STATUS_TEXTS:
                             class_info['status'] = text
                             if current_info:
                                 class_info['details'] = current_info
-                                schedule_data[f"Week {week_num} {days_of_week[day_index]}"]['classes'].append(class_info)
+                                day_classes.append(class_info)
                                 class_info = {}
                                 current_info = []
                         else:
                             current_info.append(text)
 
-                # Add any remaining info
-                if current_info:
-                    class_info['details'] = current_info
-                    if 'status' not in class_info:
-                        class_info['status'] = None
-                    schedule_data[f"Week {week_num} {days_of_week[day_index]}"]['classes'].append(class_info)
-
-    # Click next week button if not on last week
-    if week_num < 4:
-        next_week_button = driver.find_element(By.CSS_SELECTOR, "button.bs-marketplace-date-picker__right-button")
-        next_week_button.click()
-
-        # Wait for next week's data to load
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".bs-week-card"))
-        )
+                    # Add any remaining info
+                    if current_info:
+                        class_info['details'] = current_info
+                        if 'status' not in class_info:
+                            class_info['status'] = None
+                        day_classes.append(class_info)
+    finally:
+        driver.quit()
+
+    return schedule_data
+
+
+# Weeks are independent, so scrape them concurrently in separate browsers;
+# map keeps the results in week order
+schedule_data = {}
+with ThreadPoolExecutor(max_workers=num_weeks) as executor:
+    for week_schedule in executor.map(scrape_week, range(1, num_weeks + 1)):
+        schedule_data.update(week_schedule)
 
 # Print JSON structure
-import json
+import orjson
 # Generate filename with current datetime
 current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
 filename = f"scraped_data/row_schedule_{current_datetime}.json"
@@ -130,27 +210,24 @@ total_classes = 0
 all_classes = []
 for week_day, data in schedule_data.items():
     total_classes += len(data['classes'])
-    # Flatten the data for database storage
+    # Flatten the data for database storage; rows stay per-class dicts because
+    # each one is stored whole as the snapshot's raw JSONB
     for class_item in data['classes']:
         class_item['week_day'] = week_day
         all_classes.append(class_item)
 
 print(f"Scraped {total_classes} classes")
 
-# Import db_utils for database operations
-import os
-import sys
 
-# Add the project root to Python path to handle imports
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
-
-try:
-    from ..database.utils import write_snapshots
-except ImportError:
-    # Fallback for direct script execution
-    from src.database.utils import write_snapshots
+def save_schedule_json(path, schedule):
+    """Stream the schedule to disk as a JSON object with one week-day entry per line."""
+    with open(path, "wb") as f:
+        f.write(b"{\n")
+        for i, (week_day, data) in enumerate(schedule.items()):
+            if i:
+                f.write(b",\n")
+            f.write(orjson.dumps(week_day) + b": " + orjson.dumps(data))
+        f.write(b"\n}\n")
 
 # Write to database if DATABASE_URL is set
 if os.getenv("DATABASE_URL"):
@@ -160,13 +237,11 @@ if os.getenv("DATABASE_URL"):
     except Exception as e:
         print(f"Error writing to database: {e}")
         # Fallback to JSON if database write fails
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(schedule_data, f, indent=2, ensure_ascii=False)
+        save_schedule_json(filename, schedule_data)
         print(f"Fallback: Saved schedule data to {filename}")
 else:
     # Fallback to JSON when running locally without DATABASE_URL
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(schedule_data, f, indent=2, ensure_ascii=False)
+    save_schedule_json(filename, schedule_data)
     print(f"Saved schedule data to {filename}")
 
 # Check if all expected fields are populated correctly
@@ -193,9 +268,6 @@ else:
 print(f"Data has been saved to {filename}")
 
 
-driver.quit()
-
-
 def main():
     """Main entry point for RowReformer scraper."""
     # The scraping code above runs when this script is executed
@@ -11,18 +11,66 @@ Business Logic:
 """
 
 import os
-import json
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any, Optional
+from hashlib import blake2b
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import orjson
 import psycopg
-from psycopg.rows import dict_row
+from psycopg.rows import dict_row, tuple_row
+from psycopg.types.json import Jsonb, set_json_loads
 from dotenv import load_dotenv
 
+from ..database.utils import get_pool
+
 # Load environment variables
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Snapshot columns the aggregation reads; the write path needs id and run_id
+BRONZE_COLUMNS_SQL = """
+    s.id, s.run_id, s.source, s.class_name, s.instructor, s.location,
+    s.start_ts, s.end_ts, s.capacity, s.spots_available, s.status, s.url,
+    s.scraped_at, s.raw
+"""
+
+# Raw fields identifying a class, per source (matching your notebook logic);
+# other sources fall back to the generic key
+_CLASS_ID_KEYS = {
+    'coolcharm': ('date', 'time', 'class_name', 'location'),
+    'koepel': ('date', 'time', 'instructor', 'description'),
+    'rite': ('name', 'date', 'hour', 'address', 'instructor'),
+    'rowreformer': ('week_day', 'details'),  # Need to check the actual structure
+}
+_DEFAULT_CLASS_ID_KEYS = ('class_name', 'start_ts', 'location')
+
+# Per-source grouping key over schedule_snapshots s, built from the same raw
+# fields as SilverAggregator.generate_class_id but without its whitespace
+# stripping and falsy-value fallbacks. It can only split a class into more
+# groups, never merge two, so a Python pass over the class ids stays exact.
+CLASS_KEY_SQL = """
+    CASE s.source
+        WHEN 'coolcharm' THEN ARRAY[
+            lower(NULLIF(s.raw->>'date', '')), lower(NULLIF(s.raw->>'time', '')),
+            lower(COALESCE(NULLIF(s.raw->>'class_name', ''), s.class_name)),
+            lower(COALESCE(NULLIF(s.raw->>'location', ''), s.location))]
+        WHEN 'koepel' THEN ARRAY[
+            lower(NULLIF(s.raw->>'date', '')), lower(NULLIF(s.raw->>'time', '')),
+            lower(COALESCE(NULLIF(s.raw->>'instructor', ''), s.instructor)),
+            lower(NULLIF(s.raw->>'description', ''))]
+        WHEN 'rite' THEN ARRAY[
+            lower(NULLIF(s.raw->>'name', '')), lower(NULLIF(s.raw->>'date', '')),
+            lower(NULLIF(s.raw->>'hour', '')), lower(NULLIF(s.raw->>'address', '')),
+            lower(COALESCE(NULLIF(s.raw->>'instructor', ''), s.instructor))]
+        WHEN 'rowreformer' THEN ARRAY[
+            lower(NULLIF(s.raw->>'week_day', '')), lower(NULLIF(s.raw->>'details', ''))]
+        ELSE ARRAY[
+            lower(COALESCE(NULLIF(s.raw->>'class_name', ''), s.class_name)),
+            COALESCE(NULLIF(s.raw->>'start_ts', ''), s.start_ts::text),
+            lower(COALESCE(NULLIF(s.raw->>'location', ''), s.location))]
+    END
+"""
+
 class SilverAggregator:
     """Handles Bronze → Silver data transformation and incremental updates"""
     
@@ -32,7 +80,11 @@ class SilverAggregator:
     
     def create_silver_schema(self, conn: psycopg.Connection):
         """Create silver layer tables if they don't exist"""
-        with conn.cursor() as cur:
+        # Committed as its own transaction before the run starts: CREATE INDEX
+        # IF NOT EXISTS takes a ShareLock on silver_classes even when the index
+        # exists, and holding it for a whole run would deadlock overlapping runs.
+        # Pipeline mode sends every statement below in one burst with a single sync.
+        with conn.transaction(), conn.pipeline(), conn.cursor() as cur:
             # Silver classes table - one row per unique class
             cur.execute("""
             CREATE TABLE IF NOT EXISTS silver_classes (
@@ -60,10 +112,42 @@ class SilverAggregator:
             );
             """)
             
+            # Staging table for upserts, reused by every run; unlogged, as its
+            # contents are rebuilt each time and need no crash safety
+            cur.execute("""
+                CREATE UNLOGGED TABLE IF NOT EXISTS silver_stage (LIKE silver_classes INCLUDING DEFAULTS)
+            """)
+            
             # Indexes for performance
             cur.execute("CREATE INDEX IF NOT EXISTS ix_silver_source_start ON silver_classes(source, start_ts);")
             cur.execute("CREATE INDEX IF NOT EXISTS ix_silver_status ON silver_classes(is_cancelled, is_past);")
             cur.execute("CREATE INDEX IF NOT EXISTS ix_silver_updated ON silver_classes(last_updated_at);")
+            # Covering partial index for "upcoming, not cancelled" queries (index-only scans)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS ix_silver_future ON silver_classes (start_ts)
+                INCLUDE (source, class_name, instructor, location, spots_available, capacity, status)
+                WHERE is_cancelled = FALSE;
+            """)
+            # Partial index for the cancellation sweep over active, not-yet-past classes
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS ix_silver_future_active ON silver_classes (source, start_ts)
+                WHERE is_cancelled = FALSE AND is_past = FALSE;
+            """)
+            # lz4 compresses raw_data faster than the default pglz; only newly
+            # written values are affected, and servers before PostgreSQL 14 or
+            # built without lz4 keep pglz
+            cur.execute("""
+                DO $$
+                BEGIN
+                    IF (SELECT attcompression FROM pg_attribute
+                        WHERE attrelid = 'silver_classes'::regclass AND attname = 'raw_data') <> 'l' THEN
+                        ALTER TABLE silver_classes ALTER COLUMN raw_data SET COMPRESSION lz4;
+                    END IF;
+                EXCEPTION
+                    WHEN undefined_column OR feature_not_supported THEN NULL;
+                END
+                $$;
+            """)
             
             # Silver aggregation log table
             cur.execute("""
@@ -81,6 +165,28 @@ class SilverAggregator:
                 error_message TEXT
             );
             """)
+        
+        self.create_search_index(conn)
+    
+    def create_search_index(self, conn: psycopg.Connection):
+        """Create the trigram index backing the name/instructor/location search"""
+        # Kept out of the pipeline above: a role that may not create extensions
+        # only loses the index (the search still works, by sequential scan)
+        # instead of failing every aggregation run
+        try:
+            with conn.transaction(), conn.cursor() as cur:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+                # One column per field, so each ILIKE of the OR is served by
+                # its own index scan and combined with a BitmapOr; this
+                # replaces the earlier index over the concatenated fields
+                cur.execute("DROP INDEX IF EXISTS ix_silver_trgm;")
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS ix_silver_trgm_fields ON silver_classes USING gin (
+                        class_name gin_trgm_ops, instructor gin_trgm_ops, location gin_trgm_ops
+                    );
+                """)
+        except psycopg.Error as e:
+            print(f"⚠️ Skipping trigram search index: {e}")
     
     def enhance_record_with_raw_data(self, record: Dict) -> Dict:
         """Enhance bronze record with missing temporal/capacity data from raw JSON"""
@@ -89,7 +195,7 @@ class SilverAggregator:
         try:
             raw_data = record.get('raw')
             if isinstance(raw_data, str):
-                raw_data = json.loads(raw_data)
+                raw_data = orjson.loads(raw_data)
             elif not isinstance(raw_data, dict):
                 return enhanced
             
@@ -267,57 +373,50 @@ class SilverAggregator:
     def generate_class_id(self, record: Dict[str, Any]) -> str:
         """Generate unique class ID based on source and class characteristics"""
         source = record['source']
-        
-        # Use different key combinations per source (matching your notebook logic)
-        if source == 'coolcharm':
-            keys = ['date', 'time', 'class_name', 'location']
-        elif source == 'koepel':
-            keys = ['date', 'time', 'instructor', 'description'] 
-        elif source == 'rite':
-            keys = ['name', 'date', 'hour', 'address', 'instructor']
-        elif source == 'rowreformer':
-            keys = ['week_day', 'details']  # Need to check the actual structure
-        else:
-            # Generic fallback
-            keys = ['class_name', 'start_ts', 'location']
+        keys = _CLASS_ID_KEYS.get(source, _DEFAULT_CLASS_ID_KEYS)
         
         # Extract values, handling missing keys gracefully
-        raw_data = json.loads(record['raw']) if isinstance(record['raw'], str) else record['raw']
+        # psycopg hands JSONB back already parsed; only plain JSON text needs loading
+        raw_data = orjson.loads(record['raw']) if isinstance(record['raw'], str) else record['raw']
         
-        key_values = []
-        for key in keys:
-            value = raw_data.get(key) or record.get(key) or 'unknown'
-            key_values.append(str(value).lower().strip())
+        key_values = [str(raw_data.get(key) or record.get(key) or 'unknown').lower().strip() for key in keys]
         
-        # Create deterministic ID
+        # Create deterministic ID; unlike hash(), blake2b isn't salted per process.
+        # This stays in Python rather than a GENERATED column: str() of list
+        # values (rowreformer details) and the falsy fallbacks above have no
+        # faithful SQL equivalent.
         key_string = '|'.join(key_values)
-        class_id = f"{source}:{hash(key_string) % (10**12):012d}"  # 12-digit hash
+        class_id = f"{source}:{blake2b(key_string.encode('utf-8'), digest_size=6).hexdigest()}"  # 12 hex chars
         
         return class_id
     
-    def get_new_bronze_data(self, conn: psycopg.Connection, since_timestamp: Optional[datetime] = None) -> List[Dict]:
-        """Get new bronze data since last aggregation"""
-        with conn.cursor(row_factory=dict_row) as cur:
-            if since_timestamp:
-                cur.execute("""
-                    SELECT s.*, r.started_at as run_started_at, r.git_sha
-                    FROM schedule_snapshots s
-                    JOIN scrape_runs r ON s.run_id = r.run_id
-                    WHERE s.scraped_at > %s
-                    ORDER BY s.source, s.scraped_at DESC
-                """, (since_timestamp,))
-            else:
-                # First run - get last 24 hours of data
-                since_timestamp = datetime.now(timezone.utc) - timedelta(hours=24)
-                cur.execute("""
-                    SELECT s.*, r.started_at as run_started_at, r.git_sha
+    def get_new_bronze_data(self, conn: psycopg.Connection, since_timestamp: Optional[datetime] = None) -> Iterator[Dict]:
+        """Stream the latest new bronze snapshot per class since last aggregation"""
+        if not since_timestamp:
+            # First run - get last 24 hours of data
+            since_timestamp = datetime.now(timezone.utc) - timedelta(hours=24)
+        
+        # Postgres drops the older snapshots of each class before they are sent;
+        # a server-side cursor then streams the rest in batches of itersize
+        # instead of materialising the whole result on the client
+        with conn.transaction(), conn.cursor(name="bronze_stream", row_factory=dict_row) as cur:
+            # Parse raw JSONB once, with orjson, for this cursor only
+            set_json_loads(orjson.loads, cur)
+            cur.itersize = 2000
+            # Newest first overall, so the first row seen per class_id is its latest
+            cur.execute("""
+                SELECT * FROM (
+                    SELECT DISTINCT ON (s.source, class_key)
+                        """ + BRONZE_COLUMNS_SQL + """,
+                        """ + CLASS_KEY_SQL + """ AS class_key
                     FROM schedule_snapshots s
-                    JOIN scrape_runs r ON s.run_id = r.run_id
                     WHERE s.scraped_at > %s
-                    ORDER BY s.source, s.scraped_at DESC
-                """, (since_timestamp,))
+                    ORDER BY s.source, class_key, s.scraped_at DESC
+                ) latest
+                ORDER BY scraped_at DESC
+            """, (since_timestamp,))
             
-            return cur.fetchall()
+            yield from cur
     
     def get_latest_aggregation_timestamp(self, conn: psycopg.Connection) -> Optional[datetime]:
         """Get timestamp of last successful aggregation"""
@@ -340,198 +439,185 @@ class SilverAggregator:
             'cancelled': 0
         }
         
+        # Flip every class that has started since the last run to past in one
+        # statement, whether or not it shows up in the new bronze data
+        with conn.cursor() as cur:
+            cur.execute("UPDATE silver_classes SET is_past = TRUE WHERE is_past = FALSE AND start_ts < NOW()")
+        
         # Get last aggregation time
         last_aggregation = self.get_latest_aggregation_timestamp(conn)
         
-        # Get new bronze data
-        new_records = self.get_new_bronze_data(conn, last_aggregation)
+        # Group the streamed bronze data by class_id and keep latest per class;
+        # the query already did this per class key, so this only merges keys
+        # that share an id
+        class_groups = {}
+        record_count = 0
+        for record in self.get_new_bronze_data(conn, last_aggregation):
+            record_count += 1
+            # Rows arrive newest first, so the first one per class is the latest
+            class_groups.setdefault(self.generate_class_id(record), record)
         
-        if not new_records:
+        if not record_count:
             print("No new bronze data to process")
             return stats
         
-        print(f"Processing {len(new_records)} new bronze records...")
-        
-        # Group by class_id and keep latest per class
-        class_groups = {}
-        for record in new_records:
-            class_id = self.generate_class_id(record)
-            
-            # Keep the most recent record per class
-            if class_id not in class_groups or record['scraped_at'] > class_groups[class_id]['scraped_at']:
-                class_groups[class_id] = record
+        print(f"Processing {record_count} new bronze records...")
         
         stats['processed'] = len(class_groups)
         
-        # Current time for past/future logic
-        now = datetime.now(timezone.utc)
-        
-        for class_id, latest_record in class_groups.items():
-            # Enhance record with missing temporal/capacity data from raw JSON
-            enhanced_record = self.enhance_record_with_raw_data(latest_record)
-            
-            start_ts = enhanced_record['start_ts']
-            is_past = start_ts < now if start_ts else False
-            
-            # Check if class already exists in silver
-            existing = self.get_existing_silver_record(conn, class_id)
-            
-            if existing:
-                # Existing class - apply update logic
-                if existing['is_past']:
-                    # Past class - never update
-                    print(f"Skipping past class: {class_id}")
-                    continue
-                else:
-                    # Future class - update with latest data
-                    self.update_silver_record(conn, class_id, enhanced_record, is_past)
-                    stats['updated'] += 1
-            else:
-                # New class - insert
-                self.insert_silver_record(conn, class_id, enhanced_record, is_past)
-                stats['inserted'] += 1
+        # Enhance records with missing temporal/capacity data from raw JSON
+        staged = [
+            (class_id, self.enhance_record_with_raw_data(latest_record))
+            for class_id, latest_record in class_groups.items()
+        ]
         
-        # Mark classes as cancelled if they're missing from recent scrapes
-        cancelled_count = self.mark_cancelled_classes(conn, class_groups, now)
-        stats['cancelled'] = cancelled_count
+        # Insert new classes, update future ones and cancel future classes
+        # missing from the new data in one statement; past classes are never touched
+        stats['inserted'], stats['updated'], stats['cancelled'] = self.upsert_silver_records(
+            conn, staged, require_newer=False, cancel_missing=True
+        )
         
         return stats
     
-    def get_existing_silver_record(self, conn: psycopg.Connection, class_id: str) -> Optional[Dict]:
-        """Get existing silver record for a class"""
-        with conn.cursor(row_factory=dict_row) as cur:
-            cur.execute("SELECT * FROM silver_classes WHERE class_id = %s", (class_id,))
-            return cur.fetchone()
-    
-    def insert_silver_record(self, conn: psycopg.Connection, class_id: str, record: Dict, is_past: bool):
-        """Insert new silver record"""
-        # Convert raw data to JSON string if it's a dict
-        raw_data = record['raw']
-        if isinstance(raw_data, dict):
-            raw_data = json.dumps(raw_data)
-        
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO silver_classes (
-                    class_id, source, class_name, instructor, location,
-                    start_ts, end_ts, capacity, spots_available, status, url,
-                    last_scraped_at, is_past, source_run_id, source_snapshot_id, raw_data
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                class_id,
-                record['source'],
-                record['class_name'],
-                record['instructor'], 
-                record['location'],
-                record['start_ts'],
-                record['end_ts'],
-                record['capacity'],
-                record['spots_available'],
-                record['status'],
-                record['url'],
-                record['scraped_at'],
-                is_past,
-                record['run_id'],
-                record['id'],
-                raw_data
-            ))
-    
-    def update_silver_record(self, conn: psycopg.Connection, class_id: str, record: Dict, is_past: bool):
-        """Update existing silver record"""
-        # Convert raw data to JSON string if it's a dict
-        raw_data = record['raw']
-        if isinstance(raw_data, dict):
-            raw_data = json.dumps(raw_data)
-            
-        with conn.cursor() as cur:
-            cur.execute("""
-                UPDATE silver_classes SET
-                    class_name = %s,
-                    instructor = %s,
-                    location = %s,
-                    start_ts = %s,
-                    end_ts = %s,
-                    capacity = %s,
-                    spots_available = %s,
-                    status = %s,
-                    url = %s,
-                    last_updated_at = NOW(),
-                    last_scraped_at = %s,
-                    is_past = %s,
-                    source_run_id = %s,
-                    source_snapshot_id = %s,
-                    raw_data = %s,
-                    is_cancelled = FALSE
-                WHERE class_id = %s
-            """, (
-                record['class_name'],
-                record['instructor'],
-                record['location'], 
-                record['start_ts'],
-                record['end_ts'],
-                record['capacity'],
-                record['spots_available'],
-                record['status'],
-                record['url'],
-                record['scraped_at'],
-                is_past,
-                record['run_id'],
-                record['id'],
-                raw_data,
-                class_id
-            ))
-    
-    def mark_cancelled_classes(self, conn: psycopg.Connection, active_classes: Dict, now: datetime) -> int:
-        """Mark classes as cancelled if they're missing from recent scrapes and still in future"""
-        
-        # Only mark as cancelled if:
-        # 1. Class is in the future
-        # 2. Class hasn't been seen in latest scrapes for its source
-        # 3. Class isn't already marked as cancelled
-        
-        active_class_ids = set(active_classes.keys())
-        
-        with conn.cursor() as cur:
-            # Get future classes that might need to be marked as cancelled
-            cur.execute("""
-                SELECT class_id, source
-                FROM silver_classes 
-                WHERE start_ts > %s 
-                AND is_cancelled = FALSE
-            """, (now,))
-            
-            future_classes = cur.fetchall()
+    def upsert_silver_records(self, conn: psycopg.Connection, records: Iterable[Tuple[str, Dict]], require_newer: bool = True, cancel_missing: bool = False) -> Tuple[int, int, int]:
+        """
+        Insert or refresh (class_id, record) entries in two statements.
         
-        cancelled_count = 0
+        Records are staged through a binary COPY into the unlogged silver_stage
+        table, then merged with one INSERT ... ON CONFLICT that derives is_past
+        from start_ts. Existing classes are never updated once past and, with
+        require_newer, only when the record was scraped later than the stored one.
+        With cancel_missing, the same statement also cancels the future classes
+        of every staged source that are absent from the staged records.
         
-        # Group by source to check if we have recent data for each source
-        sources_with_data = set(record['source'] for record in active_classes.values())
-        
-        for class_id, source in future_classes:
-            # Only mark as cancelled if we have recent data for this source
-            # but this specific class is missing
-            if source in sources_with_data and class_id not in active_class_ids:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        UPDATE silver_classes 
+        Returns:
+            (inserted, updated, cancelled) counts
+        """
+        with conn.transaction():
+            with conn.cursor(row_factory=tuple_row) as cur:
+                # DELETE rather than TRUNCATE: TRUNCATE swaps the table's file,
+                # which invalidates the prepared upsert below on every call, and
+                # takes an ACCESS EXCLUSIVE lock. The stage is emptied again
+                # before commit, so other runs only ever see their own rows.
+                cur.execute("DELETE FROM silver_stage")
+                
+                with cur.copy("""
+                    COPY silver_stage (
+                        class_id, source, class_name, instructor, location,
+                        start_ts, end_ts, capacity, spots_available, status, url,
+                        last_scraped_at, source_run_id, source_snapshot_id, raw_data
+                    ) FROM STDIN (FORMAT BINARY)
+                """) as copy:
+                    # Binary rows need the column types up front; timestamps then
+                    # travel as int64 microseconds and jsonb without text quoting
+                    copy.set_types([
+                        "text", "text", "text", "text", "text",
+                        "timestamptz", "timestamptz", "int4", "int4", "text", "text",
+                        "timestamptz", "text", "int8", "jsonb",
+                    ])
+                    for class_id, record in records:
+                        raw_data = record['raw']
+                        if isinstance(raw_data, str):
+                            raw_data = orjson.loads(raw_data)
+                        copy.write_row((
+                            class_id,
+                            record['source'],
+                            record['class_name'],
+                            record['instructor'],
+                            record['location'],
+                            record['start_ts'],
+                            record['end_ts'],
+                            record['capacity'],
+                            record['spots_available'],
+                            record['status'],
+                            record['url'],
+                            record['scraped_at'],
+                            record['run_id'],
+                            record['id'],
+                            Jsonb(raw_data, dumps=orjson.dumps),
+                        ))
+                
+                # xmax is 0 only on freshly inserted rows, which splits the counts.
+                # The cancellation reads the pre-statement snapshot, so it never
+                # sees the upserted rows; both only touch rows absent from the
+                # other's input. Prepared up front: the initial migration runs
+                # this once per chunk, and psycopg's default threshold would
+                # parse and plan it afresh for the first five calls on a
+                # connection. The plan stays valid because the stage is emptied
+                # with DELETE; an ANALYZE of either table still forces one re-plan.
+                cur.execute("""
+                    WITH upserted AS (
+                        INSERT INTO silver_classes (
+                            class_id, source, class_name, instructor, location,
+                            start_ts, end_ts, capacity, spots_available, status, url,
+                            last_scraped_at, is_past, source_run_id, source_snapshot_id, raw_data
+                        )
+                        SELECT
+                            class_id, source, class_name, instructor, location,
+                            start_ts, end_ts, capacity, spots_available, status, url,
+                            last_scraped_at, COALESCE(start_ts < NOW(), FALSE),
+                            source_run_id, source_snapshot_id, raw_data
+                        FROM silver_stage
+                        ON CONFLICT (class_id) DO UPDATE SET
+                            class_name = EXCLUDED.class_name,
+                            instructor = EXCLUDED.instructor,
+                            location = EXCLUDED.location,
+                            start_ts = EXCLUDED.start_ts,
+                            end_ts = EXCLUDED.end_ts,
+                            capacity = EXCLUDED.capacity,
+                            spots_available = EXCLUDED.spots_available,
+                            status = EXCLUDED.status,
+                            url = EXCLUDED.url,
+                            last_updated_at = NOW(),
+                            last_scraped_at = EXCLUDED.last_scraped_at,
+                            is_past = EXCLUDED.is_past,
+                            source_run_id = EXCLUDED.source_run_id,
+                            source_snapshot_id = EXCLUDED.source_snapshot_id,
+                            -- Keeping the stored value reuses its TOAST pointer
+                            -- instead of rewriting an unchanged document
+                            raw_data = CASE WHEN silver_classes.raw_data = EXCLUDED.raw_data
+                                THEN silver_classes.raw_data ELSE EXCLUDED.raw_data END,
+                            is_cancelled = FALSE
+                        WHERE (NOT %(require_newer)s OR EXCLUDED.last_scraped_at > silver_classes.last_scraped_at)
+                        AND silver_classes.is_past IS NOT TRUE
+                        RETURNING (xmax = 0) AS inserted
+                    ),
+                    -- A future class is never stored as past, so is_past = FALSE
+                    -- changes nothing but lets ix_silver_future_active match
+                    cancelled AS (
+                        UPDATE silver_classes c
                         SET is_cancelled = TRUE, last_updated_at = NOW()
-                        WHERE class_id = %s
-                    """, (class_id,))
-                cancelled_count += 1
+                        WHERE %(cancel_missing)s
+                        AND c.start_ts > NOW()
+                        AND c.is_cancelled = FALSE
+                        AND c.is_past = FALSE
+                        AND c.source IN (SELECT source FROM silver_stage)
+                        AND NOT EXISTS (SELECT 1 FROM silver_stage st WHERE st.class_id = c.class_id)
+                        RETURNING 1
+                    )
+                    SELECT
+                        (SELECT COUNT(*) FILTER (WHERE inserted) FROM upserted),
+                        (SELECT COUNT(*) FILTER (WHERE NOT inserted) FROM upserted),
+                        (SELECT COUNT(*) FROM cancelled)
+                """, {'require_newer': require_newer, 'cancel_missing': cancel_missing}, prepare=True)
+                inserted, updated, cancelled = cur.fetchone()
+                
+                cur.execute("DELETE FROM silver_stage")
         
-        return cancelled_count
+        return inserted, updated, cancelled
     
     def log_aggregation_run(self, conn: psycopg.Connection, run_id: str, source: str, stats: Dict[str, int], status: str = 'completed', error: str = None):
         """Log aggregation run results"""
+        # clock_timestamp(), not NOW(): the run is one transaction and NOW() is its start
         with conn.cursor() as cur:
             cur.execute("""
                 INSERT INTO silver_aggregation_log (
                     run_id, source, completed_at, records_processed, 
                     records_inserted, records_updated, records_cancelled, status, error_message
-                ) VALUES (%s, %s, NOW(), %s, %s, %s, %s, %s, %s)
+                ) VALUES (%s, %s, clock_timestamp(), %s, %s, %s, %s, %s, %s)
             """, (
-                run_id, source, stats['processed'], stats['inserted'],
-                stats['updated'], stats['cancelled'], status, error
+                run_id, source, stats.get('processed'), stats.get('inserted'),
+                stats.get('updated'), stats.get('cancelled'), status, error
             ))
     
     def run_aggregation(self, run_id: str = None) -> Dict[str, int]:
@@ -542,8 +628,11 @@ class SilverAggregator:
         
         print(f"Starting silver aggregation run: {run_id}")
         
-        try:
-            with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        # Pooled connections skip the connect/auth handshake on repeat runs.
+        # The schema step commits on its own first; the rest of the run,
+        # success log included, then commits on exit as one transaction
+        with get_pool().connection() as conn:
+            try:
                 # Ensure schema exists
                 self.create_silver_schema(conn)
                 
@@ -556,14 +645,16 @@ class SilverAggregator:
                 print(f"Aggregation completed: {stats}")
                 return stats
                 
-        except Exception as e:
-            print(f"Aggregation failed: {e}")
-            try:
-                with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+            except Exception as e:
+                print(f"Aggregation failed: {e}")
+                # Discard the failed run and log on the same connection
+                try:
+                    conn.rollback()
                     self.log_aggregation_run(conn, run_id, 'all', {}, 'failed', str(e))
-            except:
-                pass
-            raise
+                    conn.commit()
+                except Exception:
+                    pass
+                raise
 
 def main():
     """Command line entry point"""
@@ -4,54 +4,116 @@ Silver Layer Query Utility
 Provides helpful queries to explore and monitor the silver layer data.
 """
 
+import io
 import os
-from datetime import datetime, timezone, timedelta
-import psycopg
+import sys
 from psycopg.rows import dict_row
 from dotenv import load_dotenv
 
+from ..database.utils import get_pool
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Queries shared by the per-section methods and get_summary_report
+_STATS_BY_SOURCE_SQL = """
+    SELECT 
+        source,
+        COUNT(*) as total_classes,
+        COUNT(*) FILTER (WHERE is_cancelled) as cancelled_classes,
+        COUNT(*) FILTER (WHERE is_past) as past_classes,
+        COUNT(*) FILTER (WHERE start_ts > NOW()) as future_classes
+    FROM silver_classes
+    GROUP BY source
+    ORDER BY source
+"""
+
+_OVERALL_STATS_SQL = """
+    SELECT 
+        COUNT(*) as total_classes,
+        COUNT(*) FILTER (WHERE is_cancelled) as cancelled_classes,
+        COUNT(*) FILTER (WHERE is_past) as past_classes,
+        COUNT(*) FILTER (WHERE start_ts > NOW()) as future_classes,
+        MIN(start_ts) as earliest_class,
+        MAX(start_ts) as latest_class
+    FROM silver_classes
+"""
+
+_AVAILABILITY_SQL = """
+    SELECT 
+        source,
+        COUNT(*) as total_classes,
+        AVG(spots_available::float / NULLIF(capacity, 0) * 100) as avg_availability_pct,
+        COUNT(*) FILTER (WHERE spots_available = 0) as fully_booked,
+        COUNT(*) FILTER (WHERE spots_available::float / NULLIF(capacity, 0) > 0.8) as high_availability
+    FROM silver_classes
+    WHERE start_ts > NOW()
+    AND is_cancelled = FALSE
+    AND capacity > 0
+    GROUP BY source
+    ORDER BY source
+"""
+
+# Takes (limit,)
+_RECENT_AGGREGATIONS_SQL = """
+    SELECT *
+    FROM silver_aggregation_log
+    ORDER BY started_at DESC
+    LIMIT %s
+"""
+
+# Takes (hours_ahead, limit)
+_UPCOMING_CLASSES_SQL = """
+    SELECT 
+        source,
+        class_name,
+        instructor,
+        location,
+        start_ts,
+        spots_available,
+        capacity,
+        status
+    FROM silver_classes
+    WHERE start_ts > NOW() 
+    AND start_ts <= NOW() + %s * INTERVAL '1 hour'
+    AND is_cancelled = FALSE
+    ORDER BY start_ts
+    LIMIT %s
+"""
+
 class SilverQueryUtility:
     """Utility for querying and monitoring silver layer data"""
     
     def __init__(self):
         if not DATABASE_URL:
             raise RuntimeError("DATABASE_URL not set")
+        # The process-wide pool, shared with the aggregator, instead of a fresh
+        # connection per method
+        self._pool = get_pool()
+    
+    def close(self):
+        """Release the utility; the shared pool stays open for other users"""
+        # The pool belongs to the process, not to this utility, so only drop
+        # the reference instead of closing it
+        self._pool = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def get_summary_stats(self):
         """Get high-level summary statistics"""
-        with psycopg.connect(DATABASE_URL) as conn, conn.cursor(row_factory=dict_row) as cur:
+        with self._pool.connection() as conn, conn.cursor(row_factory=dict_row) as cur:
             
             # Total classes by source
-            cur.execute("""
-                SELECT 
-                    source,
-                    COUNT(*) as total_classes,
-                    COUNT(*) FILTER (WHERE is_cancelled) as cancelled_classes,
-                    COUNT(*) FILTER (WHERE is_past) as past_classes,
-                    COUNT(*) FILTER (WHERE start_ts > NOW()) as future_classes
-                FROM silver_classes
-                GROUP BY source
-                ORDER BY source
-            """)
-            
+            cur.execute(_STATS_BY_SOURCE_SQL)
             by_source = cur.fetchall()
             
             # Overall stats
-            cur.execute("""
-                SELECT 
-                    COUNT(*) as total_classes,
-                    COUNT(*) FILTER (WHERE is_cancelled) as cancelled_classes,
-                    COUNT(*) FILTER (WHERE is_past) as past_classes,
-                    COUNT(*) FILTER (WHERE start_ts > NOW()) as future_classes,
-                    MIN(start_ts) as earliest_class,
-                    MAX(start_ts) as latest_class
-                FROM silver_classes
-            """)
-            
+            cur.execute(_OVERALL_STATS_SQL)
             overall = cur.fetchone()
             
             return {
@@ -59,66 +121,52 @@ class SilverQueryUtility:
                 'by_source': by_source
             }
     
+    def get_summary_report(self, recent_runs=5, hours_ahead=72, upcoming_limit=10):
+        """Get overall, per-source, availability, recent-run and upcoming stats in one round-trip"""
+        # Pipeline mode sends all five queries before reading any result, while
+        # each section still comes back as ordinary rows with native types
+        sections = {
+            'overall': (_OVERALL_STATS_SQL, None),
+            'by_source': (_STATS_BY_SOURCE_SQL, None),
+            'availability': (_AVAILABILITY_SQL, None),
+            'recent_runs': (_RECENT_AGGREGATIONS_SQL, (recent_runs,)),
+            'upcoming': (_UPCOMING_CLASSES_SQL, (hours_ahead, upcoming_limit)),
+        }
+        
+        with self._pool.connection() as conn, conn.pipeline():
+            cursors = {
+                name: conn.cursor(row_factory=dict_row).execute(query, params)
+                for name, (query, params) in sections.items()
+            }
+            report = {name: cur.fetchall() for name, cur in cursors.items()}
+        
+        report['overall'] = report['overall'][0]
+        return report
+    
     def get_recent_aggregations(self, limit=10):
         """Get recent aggregation run logs"""
-        with psycopg.connect(DATABASE_URL) as conn, conn.cursor(row_factory=dict_row) as cur:
-            cur.execute("""
-                SELECT *
-                FROM silver_aggregation_log
-                ORDER BY started_at DESC
-                LIMIT %s
-            """, (limit,))
+        with self._pool.connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(_RECENT_AGGREGATIONS_SQL, (limit,))
             
             return cur.fetchall()
     
     def get_upcoming_classes(self, hours_ahead=24, limit=20):
         """Get upcoming classes in the next N hours"""
-        with psycopg.connect(DATABASE_URL) as conn, conn.cursor(row_factory=dict_row) as cur:
-            future_time = datetime.now(timezone.utc) + timedelta(hours=hours_ahead)
-            
-            cur.execute("""
-                SELECT 
-                    source,
-                    class_name,
-                    instructor,
-                    location,
-                    start_ts,
-                    spots_available,
-                    capacity,
-                    status
-                FROM silver_classes
-                WHERE start_ts > NOW() 
-                AND start_ts <= %s
-                AND is_cancelled = FALSE
-                ORDER BY start_ts
-                LIMIT %s
-            """, (future_time, limit))
+        with self._pool.connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(_UPCOMING_CLASSES_SQL, (hours_ahead, limit))
             
             return cur.fetchall()
     
     def get_availability_summary(self):
         """Get availability summary for upcoming classes"""
-        with psycopg.connect(DATABASE_URL) as conn, conn.cursor(row_factory=dict_row) as cur:
-            cur.execute("""
-                SELECT 
-                    source,
-                    COUNT(*) as total_classes,
-                    AVG(spots_available::float / NULLIF(capacity, 0) * 100) as avg_availability_pct,
-                    COUNT(*) FILTER (WHERE spots_available = 0) as fully_booked,
-                    COUNT(*) FILTER (WHERE spots_available::float / NULLIF(capacity, 0) > 0.8) as high_availability
-                FROM silver_classes
-                WHERE start_ts > NOW()
-                AND is_cancelled = FALSE
-                AND capacity > 0
-                GROUP BY source
-                ORDER BY source
-            """)
+        with self._pool.connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(_AVAILABILITY_SQL)
             
             return cur.fetchall()
     
     def get_classes_by_location_time(self, location_filter=None):
         """Get class distribution by location and time"""
-        with psycopg.connect(DATABASE_URL) as conn, conn.cursor(row_factory=dict_row) as cur:
+        with self._pool.connection() as conn, conn.cursor(row_factory=dict_row) as cur:
             where_clause = "WHERE start_ts > NOW() AND is_cancelled = FALSE"
             params = []
             
@@ -143,7 +191,7 @@ class SilverQueryUtility:
     
     def search_classes(self, search_term, limit=50):
         """Search classes by name, instructor, or location"""
-        with psycopg.connect(DATABASE_URL) as conn, conn.cursor(row_factory=dict_row) as cur:
+        with self._pool.connection() as conn, conn.cursor(row_factory=dict_row) as cur:
             cur.execute("""
                 SELECT 
                     source,
@@ -158,73 +206,74 @@ class SilverQueryUtility:
                     is_cancelled
                 FROM silver_classes
                 WHERE (
-                    class_name ILIKE %s
-                    OR instructor ILIKE %s
-                    OR location ILIKE %s
+                    class_name ILIKE %(pattern)s
+                    OR instructor ILIKE %(pattern)s
+                    OR location ILIKE %(pattern)s
                 )
                 AND start_ts > NOW() - INTERVAL '7 days'
                 ORDER BY start_ts
-                LIMIT %s
-            """, (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%", limit))
+                LIMIT %(limit)s
+            """, {'pattern': f"%{search_term}%", 'limit': limit})
             
             return cur.fetchall()
 
 def print_summary():
     """Print a comprehensive summary of the silver layer"""
     utility = SilverQueryUtility()
+    out = io.StringIO()
+    w = out.write
+
+    w("=" * 60 + "\n")
+    w("🥈 SILVER LAYER SUMMARY\n")
+    w("=" * 60 + "\n")
     
-    print("=" * 60)
-    print("🥈 SILVER LAYER SUMMARY")
-    print("=" * 60)
-    
-    # Summary stats
-    stats = utility.get_summary_stats()
-    overall = stats['overall']
+    # All summary sections come back in a single round trip
+    report = utility.get_summary_report(recent_runs=5, hours_ahead=72, upcoming_limit=10)
+    overall = report['overall']
     
-    print(f"\n📊 Overall Statistics:")
-    print(f"  Total Classes: {overall['total_classes']:,}")
-    print(f"  Past Classes: {overall['past_classes']:,}")
-    print(f"  Future Classes: {overall['future_classes']:,}")
-    print(f"  Cancelled Classes: {overall['cancelled_classes']:,}")
-    print(f"  Date Range: {overall['earliest_class']} → {overall['latest_class']}")
+    w(f"\n📊 Overall Statistics:\n")
+    w(f"  Total Classes: {overall['total_classes']:,}\n")
+    w(f"  Past Classes: {overall['past_classes']:,}\n")
+    w(f"  Future Classes: {overall['future_classes']:,}\n")
+    w(f"  Cancelled Classes: {overall['cancelled_classes']:,}\n")
+    w(f"  Date Range: {overall['earliest_class']} → {overall['latest_class']}\n")
     
-    print(f"\n📈 By Source:")
-    for source_stat in stats['by_source']:
-        print(f"  {source_stat['source'].upper()}:")
-        print(f"    Total: {source_stat['total_classes']:,}")
-        print(f"    Future: {source_stat['future_classes']:,}")
-        print(f"    Cancelled: {source_stat['cancelled_classes']:,}")
+    w(f"\n📈 By Source:\n")
+    for source_stat in report['by_source']:
+        w(f"  {source_stat['source'].upper()}:\n")
+        w(f"    Total: {source_stat['total_classes']:,}\n")
+        w(f"    Future: {source_stat['future_classes']:,}\n")
+        w(f"    Cancelled: {source_stat['cancelled_classes']:,}\n")
     
     # Availability summary
-    print(f"\n🎯 Availability Summary (Upcoming Classes):")
-    availability = utility.get_availability_summary()
-    for avail in availability:
-        print(f"  {avail['source'].upper()}:")
-        print(f"    Total Classes: {avail['total_classes']:,}")
-        print(f"    Avg Availability: {avail['avg_availability_pct']:.1f}%")
-        print(f"    Fully Booked: {avail['fully_booked']:,}")
-        print(f"    High Availability (>80%): {avail['high_availability']:,}")
+    w(f"\n🎯 Availability Summary (Upcoming Classes):\n")
+    for avail in report['availability']:
+        w(f"  {avail['source'].upper()}:\n")
+        w(f"    Total Classes: {avail['total_classes']:,}\n")
+        w(f"    Avg Availability: {avail['avg_availability_pct']:.1f}%\n")
+        w(f"    Fully Booked: {avail['fully_booked']:,}\n")
+        w(f"    High Availability (>80%): {avail['high_availability']:,}\n")
     
     # Recent aggregations
-    print(f"\n⚙️  Recent Aggregation Runs:")
-    recent_runs = utility.get_recent_aggregations(5)
-    for run in recent_runs:
+    w(f"\n⚙️  Recent Aggregation Runs:\n")
+    for run in report['recent_runs']:
         status_icon = "✅" if run['status'] == 'completed' else "❌"
-        print(f"  {status_icon} {run['started_at']} - {run['run_id']}")
+        w(f"  {status_icon} {run['started_at']} - {run['run_id']}\n")
         if run['status'] == 'completed':
-            print(f"    Processed: {run['records_processed']} | Inserted: {run['records_inserted']} | Updated: {run['records_updated']}")
+            w(f"    Processed: {run['records_processed']} | Inserted: {run['records_inserted']} | Updated: {run['records_updated']}\n")
     
     # Upcoming classes
-    print(f"\n🔮 Next 10 Upcoming Classes:")
-    upcoming = utility.get_upcoming_classes(hours_ahead=72, limit=10)
-    for cls in upcoming:
+    w(f"\n🔮 Next 10 Upcoming Classes:\n")
+    for cls in report['upcoming']:
         availability = f"{cls['spots_available']}/{cls['capacity']}" if cls['capacity'] else "Unknown"
-        print(f"  {cls['start_ts']} | {cls['source'].upper()} | {cls['class_name']} | {availability}")
+        w(f"  {cls['start_ts']} | {cls['source'].upper()} | {cls['class_name']} | {availability}\n")
+
+    sys.stdout.write(out.getvalue())
 
 def interactive_search():
     """Interactive search interface"""
     utility = SilverQueryUtility()
-    
+
     print("\n🔍 Interactive Class Search")
     print("Enter search terms to find classes by name, instructor, or location")
     print("Type 'quit' to exit")
@@ -244,22 +293,23 @@ def interactive_search():
             print(f"No classes found matching '{search_term}'")
             continue
         
-        print(f"\nFound {len(results)} classes matching '{search_term}':")
-        print("-" * 80)
+        out = io.StringIO()
+        w = out.write
+        w(f"\nFound {len(results)} classes matching '{search_term}':\n")
+        w("-" * 80 + "\n")
         
         for cls in results[:20]:  # Show first 20 results
             status = "❌ CANCELLED" if cls['is_cancelled'] else cls['status']
             availability = f"{cls['spots_available']}/{cls['capacity']}" if cls['capacity'] else "Unknown"
             
-            print(f"{cls['start_ts']} | {cls['source'].upper()}")
-            print(f"  {cls['class_name']} with {cls['instructor'] or 'Unknown instructor'}")
-            print(f"  📍 {cls['location']} | 👥 {availability} | {status}")
-            print()
+            w(f"{cls['start_ts']} | {cls['source'].upper()}\n")
+            w(f"  {cls['class_name']} with {cls['instructor'] or 'Unknown instructor'}\n")
+            w(f"  📍 {cls['location']} | 👥 {availability} | {status}\n\n")
+        
+        sys.stdout.write(out.getvalue())
 
 def main():
     """Main CLI interface"""
-    import sys
-    
     if len(sys.argv) > 1:
         command = sys.argv[1].lower()
         